@@ -0,0 +1,375 @@
+import datetime
+import json
+import os
+import random
+import time
+
+# Terms aggregations over these fields only ever have a handful of keys, so the
+# synthetic responses should not pad them out to the requested size
+FIXED_TERMS_KEYS = {
+    "type": ["INDIVIDUAL", "ENTITY", "UNKNOWN"],
+    "candidate.house.keyword": ["lower", "upper"],
+}
+
+DEFAULT_TOTAL_HITS = 250000
+
+HOUSES = ["lower", "upper"]
+PARTIES = ["DEM", "REP", "LIB", "GRN"]
+STATES = ["TX", "MI", "OK", "LA", "NM", "CA", "NY"]
+CONTRIB_TYPES = ["individual", "entity", "unknown"]
+
+
+def _random_date(rng):
+    start = datetime.datetime(2019, 1, 1)
+    return start + datetime.timedelta(seconds=rng.randint(0, 3 * 365 * 24 * 3600))
+
+
+def _synthetic_filer(rng):
+    n = rng.randint(0, 2000)
+    return {"filer_id": f"{n:08d}", "type": "COH", "name": f"Committee {n}"}
+
+
+def _synthetic_candidate(rng):
+    n = rng.randint(0, 2000)
+    return {
+        "candidate_id": f"C{n:06d}",
+        "name": f"Candidate {n}",
+        "party": rng.choice(PARTIES),
+        "house": rng.choice(HOUSES),
+        "district": rng.randint(1, 150),
+    }
+
+
+def synthetic_contribution(rng):
+    return {
+        "filer": _synthetic_filer(rng),
+        "candidate": _synthetic_candidate(rng),
+        "contribution_id": str(rng.getrandbits(48)),
+        "ingested_at": _random_date(rng).isoformat(),
+        "contribution_date": _random_date(rng).isoformat(),
+        "amount": round(rng.uniform(1, 5000), 2),
+        "memo": "",
+        "type": rng.choice(CONTRIB_TYPES),
+        "name": f"Contributor {rng.randint(0, 100000)}",
+        "city": "Austin",
+        "state": rng.choice(STATES),
+        "zip": f"{rng.randint(10000, 99999)}",
+        "employer": "Self",
+        "occupation": "Attorney",
+        "job_title": "Partner",
+        "addtl_data": {},
+    }
+
+
+def synthetic_report(rng):
+    period_end = _random_date(rng)
+    return {
+        "filer": _synthetic_filer(rng),
+        "candidate": _synthetic_candidate(rng),
+        "report_id": str(rng.getrandbits(32)),
+        "ingested_at": _random_date(rng).isoformat(),
+        "type": "SEMIANNUAL",
+        "received_date": (period_end + datetime.timedelta(days=15)).isoformat(),
+        "period_start_date": (period_end - datetime.timedelta(days=180)).isoformat(),
+        "period_end_date": period_end.isoformat(),
+        "contributions_amount": round(rng.uniform(0, 500000), 2),
+        "expenditures_amount": round(rng.uniform(0, 500000), 2),
+        "ending_balance_amount": round(rng.uniform(0, 500000), 2),
+    }
+
+
+def _synthetic_stats(rng):
+    count = rng.randint(1, 100000)
+    avg = rng.uniform(10, 1000)
+    return {
+        "count": count,
+        "min": 1.0,
+        "max": 5000.0,
+        "avg": avg,
+        "sum": avg * count,
+    }
+
+
+def _synthetic_terms_keys(field, size):
+    if field in FIXED_TERMS_KEYS:
+        return FIXED_TERMS_KEYS[field][:size]
+
+    if field == "candidate.district":
+        return list(range(1, size + 1))
+
+    prefix = field.split(".")[-2] if "." in field else field
+    return [f"{prefix}-{i}" for i in range(size)]
+
+
+def synthetic_aggs(aggs, rng):
+    """Build an aggregation response that matches the shape of the request"""
+    result = {}
+
+    for name, spec in aggs.items():
+        sub_aggs = spec.get("aggs", {})
+        agg_type = next(k for k in spec if k not in ("aggs", "meta"))
+        body = spec[agg_type]
+
+        if agg_type == "stats":
+            res = _synthetic_stats(rng)
+        elif agg_type in ("max", "min"):
+            ts = _random_date(rng)
+            res = {
+                "value": ts.timestamp() * 1000,
+                "value_as_string": ts.isoformat() + "Z",
+            }
+        elif agg_type in ("sum", "avg", "cardinality", "value_count"):
+            res = {"value": rng.uniform(0, 1000000)}
+        elif agg_type == "terms":
+            # Script terms (ZIP prefixes) get keys named after the script
+            field = body.get("field", "script")
+            keys = _synthetic_terms_keys(field, body.get("size", 10))
+            buckets = []
+            for key in keys:
+                bucket = {"key": key, "doc_count": rng.randint(1, 10000)}
+                bucket.update(synthetic_aggs(sub_aggs, rng))
+                buckets.append(bucket)
+            res = {
+                "doc_count_error_upper_bound": 0,
+                "sum_other_doc_count": 0,
+                "buckets": buckets,
+            }
+        elif agg_type == "composite":
+            # Capped so paging ends after one (short) page
+            buckets = []
+            for i in range(min(body.get("size", 10), 2000)):
+                key = {}
+                for source in body["sources"]:
+                    source_name = next(iter(source))
+                    key[source_name] = f"{source_name}-{i}"
+                bucket = {"key": key, "doc_count": rng.randint(1, 100)}
+                bucket.update(synthetic_aggs(sub_aggs, rng))
+                buckets.append(bucket)
+            res = {"after_key": buckets[-1]["key"] if buckets else None}
+            res["buckets"] = buckets
+        elif agg_type == "filters":
+            buckets = {}
+            for key in body["filters"]:
+                buckets[key] = {"doc_count": rng.randint(1, 10000)}
+                buckets[key].update(synthetic_aggs(sub_aggs, rng))
+            res = {"buckets": buckets}
+        else:
+            # filter / nested / anything single-bucket
+            res = {"doc_count": rng.randint(1, 10000)}
+            res.update(synthetic_aggs(sub_aggs, rng))
+
+        result[name] = res
+
+    return result
+
+
+def _synthetic_profile_nodes(aggs, rng):
+    return [
+        {
+            "type": next(k for k in spec if k not in ("aggs", "meta")),
+            "description": name,
+            "time_in_nanos": rng.randint(10000, 50000000),
+            "children": _synthetic_profile_nodes(spec.get("aggs", {}), rng),
+        }
+        for name, spec in aggs.items()
+    ]
+
+
+def synthetic_profile(body, rng):
+    filters = body.get("query", {}).get("bool", {}).get("filter", [])
+    query_nodes = [
+        {
+            "type": "BooleanQuery",
+            "description": "bool",
+            "time_in_nanos": rng.randint(10000, 5000000),
+            "children": [
+                {
+                    "type": next(iter(f)),
+                    "description": json.dumps(f, default=str),
+                    "time_in_nanos": rng.randint(1000, 1000000),
+                }
+                for f in filters
+            ],
+        }
+    ]
+
+    return {
+        "shards": [
+            {
+                "id": f"[fake][index][{shard}]",
+                "searches": [{"query": query_nodes}],
+                "aggregations": _synthetic_profile_nodes(body.get("aggs", {}), rng),
+            }
+            for shard in range(2)
+        ]
+    }
+
+
+def synthetic_response(body, index, total_hits=DEFAULT_TOTAL_HITS, seed=0):
+    rng = random.Random(seed)
+
+    size = min(body.get("size", 10), total_hits)
+    make_record = synthetic_report if "_reports_" in index else synthetic_contribution
+
+    track_total_hits = body.get("track_total_hits")
+    if track_total_hits is False:
+        total = None
+    elif isinstance(track_total_hits, int) and not isinstance(track_total_hits, bool):
+        total = {
+            "value": min(total_hits, track_total_hits),
+            "relation": "gte" if total_hits > track_total_hits else "eq",
+        }
+    else:
+        total = {"value": total_hits, "relation": "eq"}
+
+    res = {
+        "took": rng.randint(1, 50),
+        "timed_out": False,
+        "_shards": {"total": 1, "successful": 1, "skipped": 0, "failed": 0},
+        "hits": {
+            "total": total,
+            "max_score": None,
+            "hits": [
+                {
+                    "_index": index,
+                    "_id": str(i),
+                    "_score": None,
+                    "_source": make_record(rng),
+                }
+                for i in range(size)
+            ],
+        },
+    }
+
+    if total is None:
+        del res["hits"]["total"]
+
+    for hit in res["hits"]["hits"]:
+        # Sort values are approximated by the sorted fields' source values
+        hit["sort"] = [
+            hit["_source"].get(next(iter(sort)).replace(".keyword", ""))
+            for sort in body.get("sort", [])
+        ]
+
+    if body.get("profile"):
+        res["profile"] = synthetic_profile(body, rng)
+
+    if "aggs" in body:
+        res["aggregations"] = synthetic_aggs(body["aggs"], rng)
+
+    return res
+
+
+def get_query_kind(body, index):
+    """Classify a query so recorded responses can be looked up by file name"""
+    if "aggs" in body:
+        # Summary routes differ in the aggs they add, so they're told apart by
+        # the names of the top level aggs
+        return "aggs-" + "-".join(sorted(body["aggs"]))
+
+    if "_reports_" in index:
+        return "report_records"
+
+    return "contrib_records"
+
+
+def covers_aggs(recorded, aggs):
+    """Whether a recorded aggregations response has every agg the query asks for"""
+    for name, spec in aggs.items():
+        if name not in recorded:
+            return False
+
+        sub_aggs = spec.get("aggs")
+        if not sub_aggs:
+            continue
+
+        buckets = recorded[name].get("buckets")
+        if buckets is None:
+            # Single bucket aggs (filter, nested) hold their sub aggs directly
+            buckets = [recorded[name]]
+        elif isinstance(buckets, dict):
+            buckets = buckets.values()
+
+        if not all(covers_aggs(bucket, sub_aggs) for bucket in buckets):
+            return False
+
+    return True
+
+
+class FakeElasticsearch:
+    """
+    Stand-in for the Elasticsearch client that answers searches locally
+
+    Responses are either replayed from `<record_dir>/<kind>.json` (see
+    `get_query_kind`) or synthesized from the shape of the query. Aggregation
+    queries fall back to a generic `summary.json`, and a recording is only
+    replayed if it has every agg the query asks for. Responses are stored
+    encoded and decoded on every call so the benchmark pays the same
+    deserialization cost as the real client.
+    """
+
+    def __init__(self, latency=0.0, record_dir=None, total_hits=DEFAULT_TOTAL_HITS):
+        self.latency = latency
+        self.record_dir = record_dir
+        self.total_hits = total_hits
+        self.calls = 0
+
+        self._encoded = {}
+
+    def _load_recorded(self, kind):
+        if not self.record_dir:
+            return None
+
+        path = os.path.join(self.record_dir, f"{kind}.json")
+        if not os.path.exists(path):
+            return None
+
+        with open(path, "rb") as f:
+            return f.read()
+
+    def _find_recorded(self, body, index):
+        kinds = [get_query_kind(body, index)]
+        if "aggs" in body:
+            kinds.append("summary")
+
+        for kind in kinds:
+            encoded = self._load_recorded(kind)
+            if encoded is None:
+                continue
+
+            recorded_aggs = json.loads(encoded).get("aggregations", {})
+            if covers_aggs(recorded_aggs, body.get("aggs", {})):
+                return encoded
+
+        return None
+
+    def _get_encoded(self, body, index):
+        key = (index, json.dumps(body, sort_keys=True, default=str))
+
+        if key not in self._encoded:
+            encoded = self._find_recorded(body, index)
+            if encoded is None:
+                res = synthetic_response(body, index, self.total_hits)
+                encoded = json.dumps(res).encode("utf-8")
+            self._encoded[key] = encoded
+
+        return self._encoded[key]
+
+    def count(self, body=None, index=None, **kwargs):
+        self.calls += 1
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        return {"count": self.total_hits, "_shards": {"total": 1, "successful": 1}}
+
+    def search(self, body=None, index=None, **kwargs):
+        self.calls += 1
+
+        encoded = self._get_encoded(body or {}, index or "")
+
+        if self.latency:
+            # The real client is synchronous so this blocks a threadpool worker too
+            time.sleep(self.latency)
+
+        return json.loads(encoded)
@@ -0,0 +1,263 @@
+"""
+Offline benchmark for the API's own overhead
+
+Swaps the Elasticsearch client for `FakeElasticsearch`, drives every GET route
+in main.py concurrently through the ASGI interface and reports throughput,
+latency percentiles and per-request allocations.
+
+    poetry run python -m benchmarks.run --requests 500 --concurrency 16
+"""
+
+import argparse
+import asyncio
+import re
+import sys
+import time
+import tracemalloc
+from urllib.parse import urlencode
+
+from fastapi.routing import APIRoute
+
+from benchmarks.fake_es import FakeElasticsearch
+
+# Sample values for the path parameters used across main.py
+PATH_PARAM_VALUES = {
+    "state_code": "tx",
+    "house": "lower",
+    "district": "12",
+    "filer_id": "00000042",
+    "candidate_id": "C000042",
+}
+
+# Required query parameters for routes that can't be called without them
+ROUTE_QUERY_PARAMS = {
+    "/{state_code}/overlap": [
+        ("candidate_ids", "C000042"),
+        ("candidate_ids", "C000043"),
+    ],
+}
+
+PATH_PARAM_RE = re.compile(r"{(\w+)}")
+
+
+def get_benchmark_paths(app):
+    paths = []
+
+    for route in app.routes:
+        # Skips the docs/openapi routes, which are plain starlette routes
+        if not isinstance(route, APIRoute) or "GET" not in route.methods:
+            continue
+        if route.path.startswith("/admin"):
+            continue
+
+        path = PATH_PARAM_RE.sub(lambda m: PATH_PARAM_VALUES[m.group(1)], route.path)
+        paths.append((route.path, path))
+
+    return paths
+
+
+async def call_asgi(app, path, query_params=None):
+    """
+    Issue a single GET against the app and return (status, body). Query params
+    are a dict or a list of pairs, the latter for repeated keys.
+    """
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode("utf-8"),
+        "root_path": "",
+        "query_string": urlencode(query_params or {}).encode("utf-8"),
+        "headers": [(b"host", b"benchmark")],
+        "client": ("127.0.0.1", 0),
+        "server": ("benchmark", 80),
+    }
+
+    status = None
+    body = []
+    request_sent = False
+    response_done = asyncio.Event()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        # Streaming responses listen for a disconnect while they send, so this
+        # has to block like a real server rather than spin
+        await response_done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            body.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                response_done.set()
+
+    await app(scope, receive, send)
+
+    return status, b"".join(body)
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+
+    idx = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+async def bench_route(app, path, n_requests, concurrency, query_params=None):
+    latencies = []
+    errors = 0
+    shed = 0
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one():
+        nonlocal errors, shed
+        async with sem:
+            start = time.perf_counter()
+            status, _ = await call_asgi(app, path, query_params)
+            latencies.append(time.perf_counter() - start)
+            if status == 503:
+                # Rejected by admission control
+                shed += 1
+            elif status != 200:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one() for _ in range(n_requests)])
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+
+    return {
+        "requests": n_requests,
+        "errors": errors,
+        "shed": shed,
+        "rps": n_requests / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+    }
+
+
+async def measure_allocations(app, path, n_requests, query_params=None):
+    """Average peak traced memory and live blocks allocated for a single request"""
+    peak_total = 0
+    blocks_total = 0
+
+    for _ in range(n_requests):
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        await call_asgi(app, path, query_params)
+        after = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        stats = after.compare_to(before, "filename")
+        blocks_total += sum(max(s.count_diff, 0) for s in stats)
+        peak_total += peak
+
+    return {
+        "alloc_peak_kib": peak_total / n_requests / 1024,
+        "alloc_blocks": blocks_total / n_requests,
+    }
+
+
+def format_results(results):
+    header = (
+        f"{'route':<48} {'reqs':>6} {'err':>5} {'shed':>5} {'rps':>9} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'peak KiB':>9} {'blocks':>8}"
+    )
+    lines = [header, "-" * len(header)]
+
+    for route, r in results:
+        lines.append(
+            f"{route:<48} {r['requests']:>6} {r['errors']:>5} {r['shed']:>5} {r['rps']:>9.1f} "
+            f"{r['p50'] * 1000:>8.2f} {r['p95'] * 1000:>8.2f} {r['p99'] * 1000:>8.2f} "
+            f"{r['alloc_peak_kib']:>9.1f} {r['alloc_blocks']:>8.1f}"
+        )
+
+    return "\n".join(lines)
+
+
+async def run(args):
+    import main
+    from state_fin_api.es import get_es
+
+    fake_es = FakeElasticsearch(
+        latency=args.latency_ms / 1000,
+        record_dir=args.record_dir,
+        total_hits=args.total_hits,
+    )
+    main.app.dependency_overrides[get_es] = lambda: fake_es
+
+    extra_params = [tuple(p.split("=", 1)) for p in args.param]
+
+    results = []
+    for route, path in get_benchmark_paths(main.app):
+        if args.route and not re.search(args.route, route):
+            continue
+
+        query_params = ROUTE_QUERY_PARAMS.get(route, []) + extra_params
+
+        # Warm up so synthetic responses are generated outside the timed runs
+        await call_asgi(main.app, path, query_params)
+
+        res = await bench_route(
+            main.app, path, args.requests, args.concurrency, query_params
+        )
+        res.update(
+            await measure_allocations(main.app, path, args.alloc_requests, query_params)
+        )
+        results.append((route, res))
+
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument(
+        "--latency-ms", type=float, default=0.0, help="Simulated ES latency per search"
+    )
+    parser.add_argument(
+        "--record-dir",
+        default=None,
+        help="Directory of recorded responses (contrib_records.json, "
+        "report_records.json, aggs-<agg names>.json or summary.json) to replay "
+        "instead of synthetic ones",
+    )
+    parser.add_argument("--total-hits", type=int, default=250000)
+    parser.add_argument(
+        "--alloc-requests",
+        type=int,
+        default=5,
+        help="Requests per route to average allocation stats over",
+    )
+    parser.add_argument(
+        "--param",
+        action="append",
+        default=[],
+        help="KEY=VALUE query parameter added to every request (repeatable)",
+    )
+    parser.add_argument("--route", default=None, help="Only run routes matching regex")
+    args = parser.parse_args(argv)
+
+    results = asyncio.get_event_loop().run_until_complete(run(args))
+    print(format_results(results))
+
+    return 1 if any(r["errors"] for _, r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,34 @@
 import datetime
+import hmac
 import os
-from typing import Optional
+from typing import Dict, List, Optional
 from dotenv import load_dotenv
-from fastapi import Depends, FastAPI, Body, HTTPException
+from fastapi import Depends, FastAPI, Body, Header, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 
 from elasticsearch import Elasticsearch
 
 import state_fin_api
-from state_fin_api.es import get_es
+from state_fin_api.es import get_es, RequestOptionsElasticsearch
+from state_fin_api.es.connection import get_connection_stats
+from state_fin_api.admission import admit, get_admission_stats
+from state_fin_api.counts import count_records, search_records
+from state_fin_api.overlap import get_contributor_set, get_overlap_matrix
+from state_fin_api.partitions import plan_index, start_partition_refresher
+from state_fin_api.changes import (
+    decode_watermark,
+    get_start_positions,
+    iter_changes,
+    DEFAULT_CHANGES_LIMIT,
+    MAX_CHANGES_LIMIT,
+)
+from state_fin_api.compression import CompressionMiddleware
+from state_fin_api.profile import ProfilingElasticsearch, DebugProfileMiddleware
+from state_fin_api.directory import (
+    get_directory,
+    start_directory_refresher,
+    DIRECTORY_TTL,
+)
 from state_fin_api.query import (
     build_contrib_summary_query,
     build_contrib_records_query,
@@ -18,17 +39,23 @@ from state_fin_api.query import (
     get_filer_filter_set,
     get_candidate_filter_set,
     get_associated_filers_aggs,
+    get_geo_aggs,
     DEFAULT_LIMIT,
     DEFAULT_START_DATE,
+    DEFAULT_ZIP_LIMIT,
+    MAX_ZIP_LIMIT,
 )
 from state_fin_api.serialize import (
     serialize_contrib_summary_result,
     serialize_records_result,
+    serialize_columnar_records_result,
     serialize_filer_result,
     serialize_candidate_result,
     serialize_candidates_for_district,
     serialize_filers_associated_with_candidate,
     serialize_state_districts,
+    serialize_geo_result,
+    serialize_overlap_result,
 )
 from state_fin_api.types import (
     StateCode,
@@ -36,10 +63,19 @@ from state_fin_api.types import (
     Summary,
     StateSummary,
     DistrictSummary,
+    GeoSummary,
     FilerSummary,
     CandidateSummary,
     Contributions,
     Reports,
+    RecordFormat,
+    RecordCount,
+    CountMode,
+    DebugMode,
+    CostClass,
+    AdmissionStats,
+    ConnectionStats,
+    OverlapSummary,
 )
 
 load_dotenv()
@@ -49,92 +85,397 @@ app = FastAPI(
     title="state-fin-api",
     description="API for retrieving finance information regarding state legislature campaigns",
 )
+app.add_middleware(DebugProfileMiddleware)
+
+# Summaries repeat between hits so they're worth compressing hard and caching,
+# record pages are mostly unique so they get a cheaper level
+compression_route_settings = {
+    endpoint: (9, True)
+    for endpoint in (
+        "get_complete_summary",
+        "get_state_summary",
+        "get_state_geo_summary",
+        "get_filer_summary",
+        "get_filer_geo_summary",
+        "get_candidate_summary",
+        "get_candidate_geo_summary",
+        "get_seat_summary",
+        "get_seat_geo_summary",
+        "get_candidates_overlap_summary",
+        "get_seat_overlap_summary",
+    )
+}
+compression_route_settings.update(
+    {
+        endpoint: (4, False)
+        for endpoint in (
+            "get_all_reports",
+            "get_filer_contrib_records",
+            "get_filer_report_records",
+            "get_candidate_contrib_records",
+            "get_candidate_report_records",
+            "get_seat_contrib_records",
+            "get_seat_report_records",
+        )
+    }
+)
+
+# Added last so it's outermost and compresses the final body
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=int(os.getenv("COMPRESSION_MIN_SIZE", 1024)),
+    route_settings=compression_route_settings,
+    cache_ttl=int(os.getenv("COMPRESSION_CACHE_TTL", 30)),
+)
 
 env = os.getenv("API_ENV", "dev")
 
+# Upper bound on candidates in one overlap matrix (pairs grow quadratically)
+MAX_OVERLAP_CANDIDATES = 50
+
+# How often to look for new year partitions (e.g. the first index of a new year)
+PARTITION_REFRESH_INTERVAL = int(os.getenv("PARTITION_REFRESH_INTERVAL", 300))
+
+# Required (as the X-Admin-Token header) to use debug options. Unset disables them.
+admin_token = os.getenv("ADMIN_TOKEN")
 
-def get_contrib_index_from_state_code(state_code: StateCode):
+
+def get_contrib_index_from_state_code(
+    state_code: StateCode, start_date=None, end_date=None
+):
     global env
-    return f"{state_code}_contribs_{env}"
+    return plan_index(f"{state_code}_contribs_{env}", start_date, end_date)
 
 
-def get_report_index_from_state_code(state_code: StateCode):
+def get_report_index_from_state_code(
+    state_code: StateCode, start_date=None, end_date=None
+):
     global env
-    return f"{state_code}_reports_{env}"
+    return plan_index(f"{state_code}_reports_{env}", start_date, end_date)
 
 
-def get_wildcard_contrib_index():
+def get_wildcard_contrib_index(start_date=None, end_date=None):
     global env
-    return f"*_contribs_{env}"
+    return plan_index(f"*_contribs_{env}", start_date, end_date)
 
 
-def get_wildcard_report_index():
+def get_wildcard_report_index(start_date=None, end_date=None):
     global env
-    return f"*_reports_{env}"
+    return plan_index(f"*_reports_{env}", start_date, end_date)
+
+
+def is_admin(token):
+    # Compared as bytes, compare_digest rejects str with non-ASCII characters
+    return bool(admin_token) and hmac.compare_digest(
+        (token or "").encode("utf-8"), admin_token.encode("utf-8")
+    )
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+def get_request_es(
+    request: Request,
+    debug: Optional[DebugMode] = None,
+    x_admin_token: Optional[str] = Header(None),
+    es: Elasticsearch = Depends(get_es),
+):
+    # Set by the route's admission dependency, which FastAPI resolves first
+    cost_class = getattr(request.state, "cost_class", None)
+    if cost_class is not None:
+        es = RequestOptionsElasticsearch(es, cost_class)
+
+    if debug is None:
+        return es
+
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="Debug options require admin")
+
+    profiling_es = ProfilingElasticsearch(es)
+    request.state.profiling_es = profiling_es
+
+    return profiling_es
+
+
+def serialize_records(raw_res, page_model, format, start_date, end_date, offset, limit):
+    if format == RecordFormat.columnar:
+        # Skips the response model entirely, the point is to avoid per-row models
+        record_model = page_model.__fields__["records"].type_
+        fields = [f for f in record_model.__fields__ if f not in ("filer", "candidate")]
+        return JSONResponse(
+            serialize_columnar_records_result(
+                raw_res,
+                fields,
+                page_model.__fields__["query"].type_,
+                start_date,
+                end_date,
+                offset,
+                limit,
+            )
+        )
+
+    return serialize_records_result(raw_res, start_date, end_date, offset, limit)
+
+
+def get_candidate_overlap(es, state_code, candidate_ids, start_date, end_date):
+    index = get_contrib_index_from_state_code(state_code, start_date, end_date)
+
+    contributor_sets = {
+        candidate_id: get_contributor_set(
+            es,
+            index,
+            candidate_id,
+            get_candidate_filter_set(candidate_id),
+            start_date,
+            end_date,
+        )
+        for candidate_id in candidate_ids
+    }
+
+    return serialize_overlap_result(
+        contributor_sets, get_overlap_matrix(contributor_sets), start_date, end_date
+    )
+
+
+def has_missing_names(stats_by_id):
+    return any(stats["name"] is None for stats in stats_by_id.values())
 
 
-@app.get("/", response_model=Summary)
-async def get_complete_summary(
+@app.on_event("startup")
+def start_partition_refresh():
+    start_partition_refresher(get_es, env, PARTITION_REFRESH_INTERVAL)
+
+
+@app.on_event("startup")
+def start_directory_refresh():
+    # Every worker runs a refresher but only one of them rebuilds at a time
+    if DIRECTORY_TTL > 0:
+        start_directory_refresher(
+            get_es, [s.value for s in StateCode], get_contrib_index_from_state_code
+        )
+
+
+@app.get(
+    "/",
+    response_model=Summary,
+    dependencies=[Depends(admit(CostClass.national_aggregation))],
+)
+def get_complete_summary(
     start_date: Optional[datetime.date] = DEFAULT_START_DATE,
     end_date: Optional[datetime.date] = datetime.date.today(),
-    es: Elasticsearch = Depends(get_es),
+    es: Elasticsearch = Depends(get_request_es),
 ):
 
     query = build_contrib_summary_query(start_date, end_date)
-    raw_res = es.search(query, get_wildcard_contrib_index())
+    raw_res = es.search(query, get_wildcard_contrib_index(start_date, end_date))
 
     return serialize_contrib_summary_result(raw_res, start_date, end_date)
 
 
-@app.get("/reports", response_model=Reports)
-async def get_all_reports(
+@app.get(
+    "/reports",
+    response_model=Reports,
+    dependencies=[Depends(admit(CostClass.national_aggregation))],
+)
+def get_all_reports(
     start_date: Optional[datetime.date] = DEFAULT_START_DATE,
     end_date: Optional[datetime.date] = datetime.datetime.now(),
     limit: Optional[int] = DEFAULT_LIMIT,
     offset: Optional[int] = 0,
-    es: Elasticsearch = Depends(get_es),
+    count: Optional[CountMode] = CountMode.exact,
+    format: Optional[RecordFormat] = RecordFormat.rows,
+    es: Elasticsearch = Depends(get_request_es),
 ):
 
-    query = build_report_records_query(start_date, end_date, limit, offset)
+    query = build_report_records_query(start_date, end_date, limit, offset, count=count)
 
-    raw_res = es.search(query, get_wildcard_report_index())
+    raw_res = search_records(
+        es, query, get_wildcard_report_index(start_date, end_date), count
+    )
 
-    return serialize_records_result(raw_res, start_date, end_date, offset, limit)
+    return serialize_records(
+        raw_res, Reports, format, start_date, end_date, offset, limit
+    )
+
+
+@app.get(
+    "/reports/count",
+    response_model=RecordCount,
+    dependencies=[Depends(admit(CostClass.national_aggregation))],
+)
+def get_all_reports_count(
+    start_date: Optional[datetime.date] = DEFAULT_START_DATE,
+    end_date: Optional[datetime.date] = datetime.datetime.now(),
+    es: Elasticsearch = Depends(get_request_es),
+):
+
+    query = build_report_records_query(start_date, end_date)
+    return count_records(
+        es, query, get_wildcard_report_index(start_date, end_date), start_date, end_date
+    )
+
+
+@app.get(
+    "/admin/admission",
+    response_model=Dict[str, AdmissionStats],
+    dependencies=[Depends(require_admin)],
+)
+def get_admission_summary():
+    return get_admission_stats()
+
+
+@app.get(
+    "/admin/es",
+    response_model=List[ConnectionStats],
+    dependencies=[Depends(require_admin)],
+)
+def get_es_connection_summary(es: Elasticsearch = Depends(get_es)):
+    return get_connection_stats(es)
 
 
-@app.get("/{state_code}", response_model=StateSummary)
-async def get_state_summary(
+@app.get(
+    "/{state_code}",
+    response_model=StateSummary,
+    dependencies=[Depends(admit(CostClass.state_aggregation))],
+)
+def get_state_summary(
     state_code: StateCode,
     start_date: Optional[datetime.date] = DEFAULT_START_DATE,
-    end_date: Optional[datetime.date] = datetime.date.today(),
-    es: Elasticsearch = Depends(get_es),
+    end_date: Optional[datetime.date] = None,
+    es: Elasticsearch = Depends(get_request_es),
 ):
+    # Resolved per request so a long running worker's default range keeps
+    # reaching the directory's (regularly rebuilt) build date
+    if end_date is None:
+        end_date = datetime.date.today()
+
+    directory = get_directory(state_code.value)
+    use_directory = directory is not None and directory.covers(start_date, end_date)
 
-    district_aggs = get_available_districts_aggs()
+    district_aggs = {} if use_directory else get_available_districts_aggs()
 
     query = build_contrib_summary_query(start_date, end_date, addtl_aggs=district_aggs)
-    raw_res = es.search(query, get_contrib_index_from_state_code(state_code))
+    raw_res = es.search(
+        query, get_contrib_index_from_state_code(state_code, start_date, end_date)
+    )
+
+    result = serialize_contrib_summary_result(raw_res, start_date, end_date)
+    if use_directory:
+        result["districts"] = directory.districts
+    else:
+        result.update(serialize_state_districts(raw_res))
+
+    return result
+
+
+@app.get(
+    "/{state_code}/geo",
+    response_model=GeoSummary,
+    dependencies=[Depends(admit(CostClass.state_aggregation))],
+)
+def get_state_geo_summary(
+    state_code: StateCode,
+    start_date: Optional[datetime.date] = DEFAULT_START_DATE,
+    end_date: Optional[datetime.date] = datetime.date.today(),
+    zip_limit: int = Query(DEFAULT_ZIP_LIMIT, ge=1, le=MAX_ZIP_LIMIT),
+    es: Elasticsearch = Depends(get_request_es),
+):
+    geo_aggs = get_geo_aggs(state_code.value, zip_limit)
+
+    query = build_contrib_summary_query(
+        start_date,
+        end_date,
+        addtl_aggs=geo_aggs,
+    )
+    raw_res = es.search(
+        query, get_contrib_index_from_state_code(state_code, start_date, end_date)
+    )
 
     result = serialize_contrib_summary_result(raw_res, start_date, end_date)
-    result.update(serialize_state_districts(raw_res))
+    result.update(serialize_geo_result(raw_res))
 
     return result
 
 
-@app.get("/{state_code}/filer/{filer_id}", response_model=FilerSummary)
-async def get_filer_summary(
+@app.get(
+    "/{state_code}/overlap",
+    response_model=OverlapSummary,
+    dependencies=[Depends(admit(CostClass.state_aggregation))],
+)
+def get_candidates_overlap_summary(
+    state_code: StateCode,
+    candidate_ids: List[str] = Query(...),
+    start_date: Optional[datetime.date] = DEFAULT_START_DATE,
+    end_date: Optional[datetime.date] = datetime.date.today(),
+    es: Elasticsearch = Depends(get_request_es),
+):
+    candidate_ids = list(dict.fromkeys(candidate_ids))
+    if not 2 <= len(candidate_ids) <= MAX_OVERLAP_CANDIDATES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Between 2 and {MAX_OVERLAP_CANDIDATES} candidates are required",
+        )
+
+    return get_candidate_overlap(es, state_code, candidate_ids, start_date, end_date)
+
+
+@app.get(
+    "/{state_code}/changes",
+    dependencies=[Depends(admit(CostClass.change_feed))],
+)
+def get_state_changes(
+    state_code: StateCode,
+    watermark: Optional[str] = None,
+    since: Optional[datetime.datetime] = None,
+    limit: int = Query(DEFAULT_CHANGES_LIMIT, ge=1, le=MAX_CHANGES_LIMIT),
+    es: Elasticsearch = Depends(get_request_es),
+):
+    if watermark and since:
+        raise HTTPException(
+            status_code=400, detail="Pass either watermark or since, not both"
+        )
+
+    if watermark:
+        try:
+            positions = decode_watermark(watermark)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    else:
+        positions = get_start_positions(since)
+
+    indices = {
+        "contribution": get_contrib_index_from_state_code(state_code),
+        "report": get_report_index_from_state_code(state_code),
+    }
+
+    return StreamingResponse(
+        iter_changes(es, indices, positions, limit),
+        media_type="application/x-ndjson",
+    )
+
+
+@app.get(
+    "/{state_code}/filer/{filer_id}",
+    response_model=FilerSummary,
+    dependencies=[Depends(admit(CostClass.entity_summary))],
+)
+def get_filer_summary(
     state_code: StateCode,
     filer_id: str,
     start_date: Optional[datetime.date] = DEFAULT_START_DATE,
     end_date: Optional[datetime.date] = datetime.date.today(),
-    es: Elasticsearch = Depends(get_es),
+    es: Elasticsearch = Depends(get_request_es),
 ):
     filer_filter_set = get_filer_filter_set(filer_id)
 
     query = build_contrib_summary_query(
         start_date, end_date, filters=filer_filter_set, include_sample=True
     )
-    raw_res = es.search(query, get_contrib_index_from_state_code(state_code))
+    raw_res = es.search(
+        query, get_contrib_index_from_state_code(state_code, start_date, end_date)
+    )
 
     filer = serialize_filer_result(raw_res)
     if not filer:
@@ -142,73 +483,195 @@ async def get_filer_summary(
         raise HTTPException(
             status_code=404, detail="Filer not found within query parameters"
         )
-    result = serializ_contrib_summary_result(raw_res, start_date, end_date)
+    result = serialize_contrib_summary_result(raw_res, start_date, end_date)
     result.update(filer)
 
     return result
 
 
-@app.get("/{state_code}/filer/{filer_id}/contribs", response_model=Contributions)
-async def get_filer_contrib_records(
+@app.get(
+    "/{state_code}/filer/{filer_id}/geo",
+    response_model=GeoSummary,
+    dependencies=[Depends(admit(CostClass.entity_summary))],
+)
+def get_filer_geo_summary(
+    state_code: StateCode,
+    filer_id: str,
+    start_date: Optional[datetime.date] = DEFAULT_START_DATE,
+    end_date: Optional[datetime.date] = datetime.date.today(),
+    zip_limit: int = Query(DEFAULT_ZIP_LIMIT, ge=1, le=MAX_ZIP_LIMIT),
+    es: Elasticsearch = Depends(get_request_es),
+):
+    filer_filter_set = get_filer_filter_set(filer_id)
+    geo_aggs = get_geo_aggs(state_code.value, zip_limit)
+
+    query = build_contrib_summary_query(
+        start_date,
+        end_date,
+        filters=filer_filter_set,
+        addtl_aggs=geo_aggs,
+    )
+    raw_res = es.search(
+        query, get_contrib_index_from_state_code(state_code, start_date, end_date)
+    )
+
+    result = serialize_contrib_summary_result(raw_res, start_date, end_date)
+    result.update(serialize_geo_result(raw_res))
+
+    return result
+
+
+@app.get(
+    "/{state_code}/filer/{filer_id}/contribs",
+    response_model=Contributions,
+    dependencies=[Depends(admit(CostClass.record_page))],
+)
+def get_filer_contrib_records(
     state_code: StateCode,
     filer_id: str,
     start_date: Optional[datetime.date] = DEFAULT_START_DATE,
     end_date: Optional[datetime.date] = datetime.datetime.now(),
     limit: Optional[int] = DEFAULT_LIMIT,
     offset: Optional[int] = 0,
-    es: Elasticsearch = Depends(get_es),
+    count: Optional[CountMode] = CountMode.exact,
+    format: Optional[RecordFormat] = RecordFormat.rows,
+    es: Elasticsearch = Depends(get_request_es),
 ):
     filer_filter_set = get_filer_filter_set(filer_id)
 
     query = build_contrib_records_query(
-        start_date, end_date, limit, offset, filer_filter_set
+        start_date, end_date, limit, offset, filer_filter_set, count=count
     )
 
-    raw_res = es.search(query, get_contrib_index_from_state_code(state_code))
+    raw_res = search_records(
+        es,
+        query,
+        get_contrib_index_from_state_code(state_code, start_date, end_date),
+        count,
+    )
 
-    return serialize_records_result(raw_res, start_date, end_date, offset, limit)
+    return serialize_records(
+        raw_res, Contributions, format, start_date, end_date, offset, limit
+    )
 
 
-@app.get("/{state_code}/filer/{filer_id}/reports", response_model=Reports)
-async def get_filer_report_records(
+@app.get(
+    "/{state_code}/filer/{filer_id}/contribs/count",
+    response_model=RecordCount,
+    dependencies=[Depends(admit(CostClass.entity_summary))],
+)
+def get_filer_contrib_count(
+    state_code: StateCode,
+    filer_id: str,
+    start_date: Optional[datetime.date] = DEFAULT_START_DATE,
+    end_date: Optional[datetime.date] = datetime.datetime.now(),
+    es: Elasticsearch = Depends(get_request_es),
+):
+    filer_filter_set = get_filer_filter_set(filer_id)
+
+    query = build_contrib_records_query(start_date, end_date, filters=filer_filter_set)
+    return count_records(
+        es,
+        query,
+        get_contrib_index_from_state_code(state_code, start_date, end_date),
+        start_date,
+        end_date,
+    )
+
+
+@app.get(
+    "/{state_code}/filer/{filer_id}/reports",
+    response_model=Reports,
+    dependencies=[Depends(admit(CostClass.record_page))],
+)
+def get_filer_report_records(
     state_code: StateCode,
     filer_id: str,
     start_date: Optional[datetime.date] = DEFAULT_START_DATE,
     end_date: Optional[datetime.date] = datetime.datetime.now(),
     limit: Optional[int] = DEFAULT_LIMIT,
     offset: Optional[int] = 0,
-    es: Elasticsearch = Depends(get_es),
+    count: Optional[CountMode] = CountMode.exact,
+    format: Optional[RecordFormat] = RecordFormat.rows,
+    es: Elasticsearch = Depends(get_request_es),
 ):
     filer_filter_set = get_filer_filter_set(filer_id)
 
     query = build_report_records_query(
-        start_date, end_date, limit, offset, filer_filter_set
+        start_date, end_date, limit, offset, filer_filter_set, count=count
     )
 
-    raw_res = es.search(query, get_report_index_from_state_code(state_code))
+    raw_res = search_records(
+        es,
+        query,
+        get_report_index_from_state_code(state_code, start_date, end_date),
+        count,
+    )
 
-    return serialize_records_result(raw_res, start_date, end_date, offset, limit)
+    return serialize_records(
+        raw_res, Reports, format, start_date, end_date, offset, limit
+    )
 
 
-@app.get("/{state_code}/candidate/{candidate_id}", response_model=CandidateSummary)
-async def get_candidate_summary(
+@app.get(
+    "/{state_code}/filer/{filer_id}/reports/count",
+    response_model=RecordCount,
+    dependencies=[Depends(admit(CostClass.entity_summary))],
+)
+def get_filer_report_count(
+    state_code: StateCode,
+    filer_id: str,
+    start_date: Optional[datetime.date] = DEFAULT_START_DATE,
+    end_date: Optional[datetime.date] = datetime.datetime.now(),
+    es: Elasticsearch = Depends(get_request_es),
+):
+    filer_filter_set = get_filer_filter_set(filer_id)
+
+    query = build_report_records_query(start_date, end_date, filters=filer_filter_set)
+    return count_records(
+        es,
+        query,
+        get_report_index_from_state_code(state_code, start_date, end_date),
+        start_date,
+        end_date,
+    )
+
+
+@app.get(
+    "/{state_code}/candidate/{candidate_id}",
+    response_model=CandidateSummary,
+    dependencies=[Depends(admit(CostClass.entity_summary))],
+)
+def get_candidate_summary(
     state_code: StateCode,
     candidate_id: str,
     start_date: Optional[datetime.date] = DEFAULT_START_DATE,
     end_date: Optional[datetime.date] = datetime.date.today(),
-    es: Elasticsearch = Depends(get_es),
+    es: Elasticsearch = Depends(get_request_es),
 ):
     candidate_filter_set = get_candidate_filter_set(candidate_id)
-    associated_filers_agg = get_associated_filers_aggs()
+    directory = get_directory(state_code.value)
+
+    def search(include_names):
+        query = build_contrib_summary_query(
+            start_date,
+            end_date,
+            filters=candidate_filter_set,
+            addtl_aggs=get_associated_filers_aggs(include_names),
+            include_sample=True,
+        )
+        return es.search(
+            query, get_contrib_index_from_state_code(state_code, start_date, end_date)
+        )
 
-    query = build_contrib_summary_query(
-        start_date,
-        end_date,
-        filters=candidate_filter_set,
-        addtl_aggs=associated_filers_agg,
-        include_sample=True,
+    raw_res = search(include_names=directory is None)
+    associated_filers = serialize_filers_associated_with_candidate(
+        raw_res, directory and directory.filer_name
     )
-    raw_res = es.search(query, get_contrib_index_from_state_code(state_code))
+    if has_missing_names(associated_filers["associated_filers"]):
+        # Filer is newer than the directory, fall back to aggregating names
+        raw_res = search(include_names=True)
+        associated_filers = serialize_filers_associated_with_candidate(raw_res)
 
     result = serialize_contrib_summary_result(raw_res, start_date, end_date)
 
@@ -221,81 +684,273 @@ async def get_candidate_summary(
         )
 
     result.update(candidate)
-    result.update(serialize_filers_associated_with_candidate(raw_res))
+    result.update(associated_filers)
+
+    return result
+
+
+@app.get(
+    "/{state_code}/candidate/{candidate_id}/geo",
+    response_model=GeoSummary,
+    dependencies=[Depends(admit(CostClass.entity_summary))],
+)
+def get_candidate_geo_summary(
+    state_code: StateCode,
+    candidate_id: str,
+    start_date: Optional[datetime.date] = DEFAULT_START_DATE,
+    end_date: Optional[datetime.date] = datetime.date.today(),
+    zip_limit: int = Query(DEFAULT_ZIP_LIMIT, ge=1, le=MAX_ZIP_LIMIT),
+    es: Elasticsearch = Depends(get_request_es),
+):
+    candidate_filter_set = get_candidate_filter_set(candidate_id)
+    geo_aggs = get_geo_aggs(state_code.value, zip_limit)
+
+    query = build_contrib_summary_query(
+        start_date,
+        end_date,
+        filters=candidate_filter_set,
+        addtl_aggs=geo_aggs,
+    )
+    raw_res = es.search(
+        query, get_contrib_index_from_state_code(state_code, start_date, end_date)
+    )
+
+    result = serialize_contrib_summary_result(raw_res, start_date, end_date)
+    result.update(serialize_geo_result(raw_res))
 
     return result
 
 
 @app.get(
-    "/{state_code}/candidate/{candidate_id}/contribs", response_model=Contributions
+    "/{state_code}/candidate/{candidate_id}/contribs",
+    response_model=Contributions,
+    dependencies=[Depends(admit(CostClass.record_page))],
 )
-async def get_candidate_contrib_records(
+def get_candidate_contrib_records(
     state_code: StateCode,
     candidate_id: str,
     start_date: Optional[datetime.date] = DEFAULT_START_DATE,
     end_date: Optional[datetime.date] = datetime.date.today(),
     limit: Optional[int] = DEFAULT_LIMIT,
     offset: Optional[int] = 0,
-    es: Elasticsearch = Depends(get_es),
+    count: Optional[CountMode] = CountMode.exact,
+    format: Optional[RecordFormat] = RecordFormat.rows,
+    es: Elasticsearch = Depends(get_request_es),
 ):
     candidate_filter_set = get_candidate_filter_set(candidate_id)
 
     query = build_contrib_records_query(
-        start_date, end_date, limit, offset, candidate_filter_set
+        start_date, end_date, limit, offset, candidate_filter_set, count=count
+    )
+    raw_res = search_records(
+        es,
+        query,
+        get_contrib_index_from_state_code(state_code, start_date, end_date),
+        count,
     )
-    raw_res = es.search(query, get_contrib_index_from_state_code(state_code))
 
-    return serialize_records_result(raw_res, start_date, end_date, offset, limit)
+    return serialize_records(
+        raw_res, Contributions, format, start_date, end_date, offset, limit
+    )
 
 
-@app.get("/{state_code}/candidate/{candidate_id}/reports", response_model=Reports)
-async def get_candidate_report_records(
+@app.get(
+    "/{state_code}/candidate/{candidate_id}/contribs/count",
+    response_model=RecordCount,
+    dependencies=[Depends(admit(CostClass.entity_summary))],
+)
+def get_candidate_contrib_count(
+    state_code: StateCode,
+    candidate_id: str,
+    start_date: Optional[datetime.date] = DEFAULT_START_DATE,
+    end_date: Optional[datetime.date] = datetime.date.today(),
+    es: Elasticsearch = Depends(get_request_es),
+):
+    candidate_filter_set = get_candidate_filter_set(candidate_id)
+
+    query = build_contrib_records_query(
+        start_date, end_date, filters=candidate_filter_set
+    )
+    return count_records(
+        es,
+        query,
+        get_contrib_index_from_state_code(state_code, start_date, end_date),
+        start_date,
+        end_date,
+    )
+
+
+@app.get(
+    "/{state_code}/candidate/{candidate_id}/reports",
+    response_model=Reports,
+    dependencies=[Depends(admit(CostClass.record_page))],
+)
+def get_candidate_report_records(
     state_code: StateCode,
     candidate_id: str,
     start_date: Optional[datetime.date] = DEFAULT_START_DATE,
     end_date: Optional[datetime.date] = datetime.date.today(),
     limit: Optional[int] = DEFAULT_LIMIT,
     offset: Optional[int] = 0,
-    es: Elasticsearch = Depends(get_es),
+    count: Optional[CountMode] = CountMode.exact,
+    format: Optional[RecordFormat] = RecordFormat.rows,
+    es: Elasticsearch = Depends(get_request_es),
 ):
     candidate_filter_set = get_candidate_filter_set(candidate_id)
 
     query = build_report_records_query(
-        start_date, end_date, limit, offset, candidate_filter_set
+        start_date, end_date, limit, offset, candidate_filter_set, count=count
+    )
+    raw_res = search_records(
+        es,
+        query,
+        get_report_index_from_state_code(state_code, start_date, end_date),
+        count,
     )
-    raw_res = es.search(query, get_report_index_from_state_code(state_code))
 
-    return serialize_records_result(raw_res, start_date, end_date, offset, limit)
+    return serialize_records(
+        raw_res, Reports, format, start_date, end_date, offset, limit
+    )
 
 
-@app.get("/{state_code}/{house}/{district}", response_model=DistrictSummary)
-async def get_seat_summary(
+@app.get(
+    "/{state_code}/candidate/{candidate_id}/reports/count",
+    response_model=RecordCount,
+    dependencies=[Depends(admit(CostClass.entity_summary))],
+)
+def get_candidate_report_count(
+    state_code: StateCode,
+    candidate_id: str,
+    start_date: Optional[datetime.date] = DEFAULT_START_DATE,
+    end_date: Optional[datetime.date] = datetime.date.today(),
+    es: Elasticsearch = Depends(get_request_es),
+):
+    candidate_filter_set = get_candidate_filter_set(candidate_id)
+
+    query = build_report_records_query(
+        start_date, end_date, filters=candidate_filter_set
+    )
+    return count_records(
+        es,
+        query,
+        get_report_index_from_state_code(state_code, start_date, end_date),
+        start_date,
+        end_date,
+    )
+
+
+@app.get(
+    "/{state_code}/{house}/{district}",
+    response_model=DistrictSummary,
+    dependencies=[Depends(admit(CostClass.entity_summary))],
+)
+def get_seat_summary(
     state_code: StateCode,
     house: HouseLevel,
     district: str,
     start_date: Optional[datetime.date] = DEFAULT_START_DATE,
     end_date: Optional[datetime.date] = datetime.date.today(),
-    es: Elasticsearch = Depends(get_es),
+    es: Elasticsearch = Depends(get_request_es),
 ):
-    candidates_for_district_aggs = get_candidates_for_district_aggs()
+    district_filter_set = get_district_filter_set(house.value, district)
+    directory = get_directory(state_code.value)
+
+    def search(include_names):
+        query = build_contrib_summary_query(
+            start_date,
+            end_date,
+            district_filter_set,
+            addtl_aggs=get_candidates_for_district_aggs(include_names),
+        )
+        return es.search(
+            query, get_contrib_index_from_state_code(state_code, start_date, end_date)
+        )
+
+    raw_res = search(include_names=directory is None)
+    candidates = serialize_candidates_for_district(
+        raw_res, directory and directory.candidate_name
+    )
+    if has_missing_names(candidates["candidates"]):
+        # Candidate is newer than the directory, fall back to aggregating names
+        raw_res = search(include_names=True)
+        candidates = serialize_candidates_for_district(raw_res)
+
+    result = serialize_contrib_summary_result(raw_res, start_date, end_date)
+    result.update(candidates)
 
+    return result
+
+
+@app.get(
+    "/{state_code}/{house}/{district}/overlap",
+    response_model=OverlapSummary,
+    dependencies=[Depends(admit(CostClass.state_aggregation))],
+)
+def get_seat_overlap_summary(
+    state_code: StateCode,
+    house: HouseLevel,
+    district: str,
+    start_date: Optional[datetime.date] = DEFAULT_START_DATE,
+    end_date: Optional[datetime.date] = datetime.date.today(),
+    es: Elasticsearch = Depends(get_request_es),
+):
     district_filter_set = get_district_filter_set(house.value, district)
     query = build_contrib_summary_query(
         start_date,
         end_date,
         district_filter_set,
-        addtl_aggs=candidates_for_district_aggs,
+        addtl_aggs=get_candidates_for_district_aggs(include_names=False),
+    )
+    raw_res = es.search(
+        query, get_contrib_index_from_state_code(state_code, start_date, end_date)
     )
-    raw_res = es.search(query, get_contrib_index_from_state_code(state_code))
 
-    result = serializ_contrib_summary_result(raw_res, start_date, end_date)
-    result.update(serialize_candidates_for_district(raw_res))
+    # Buckets come back largest first, so a cap keeps the biggest campaigns
+    buckets = raw_res["aggregations"]["candidates"]["buckets"]
+    candidate_ids = [b["key"] for b in buckets[:MAX_OVERLAP_CANDIDATES]]
+
+    return get_candidate_overlap(es, state_code, candidate_ids, start_date, end_date)
+
+
+@app.get(
+    "/{state_code}/{house}/{district}/geo",
+    response_model=GeoSummary,
+    dependencies=[Depends(admit(CostClass.entity_summary))],
+)
+def get_seat_geo_summary(
+    state_code: StateCode,
+    house: HouseLevel,
+    district: str,
+    start_date: Optional[datetime.date] = DEFAULT_START_DATE,
+    end_date: Optional[datetime.date] = datetime.date.today(),
+    zip_limit: int = Query(DEFAULT_ZIP_LIMIT, ge=1, le=MAX_ZIP_LIMIT),
+    es: Elasticsearch = Depends(get_request_es),
+):
+    district_filter_set = get_district_filter_set(house.value, district)
+    geo_aggs = get_geo_aggs(state_code.value, zip_limit)
+
+    query = build_contrib_summary_query(
+        start_date,
+        end_date,
+        filters=district_filter_set,
+        addtl_aggs=geo_aggs,
+    )
+    raw_res = es.search(
+        query, get_contrib_index_from_state_code(state_code, start_date, end_date)
+    )
+
+    result = serialize_contrib_summary_result(raw_res, start_date, end_date)
+    result.update(serialize_geo_result(raw_res))
 
     return result
 
 
-@app.get("/{state_code}/{house}/{district}/contribs", response_model=Contributions)
-async def get_seat_contrib_records(
+@app.get(
+    "/{state_code}/{house}/{district}/contribs",
+    response_model=Contributions,
+    dependencies=[Depends(admit(CostClass.record_page))],
+)
+def get_seat_contrib_records(
     state_code: StateCode,
     house: HouseLevel,
     district: str,
@@ -303,19 +958,58 @@ async def get_seat_contrib_records(
     end_date: Optional[datetime.date] = datetime.date.today(),
     limit: Optional[int] = DEFAULT_LIMIT,
     offset: Optional[int] = 0,
-    es: Elasticsearch = Depends(get_es),
+    count: Optional[CountMode] = CountMode.exact,
+    format: Optional[RecordFormat] = RecordFormat.rows,
+    es: Elasticsearch = Depends(get_request_es),
 ):
     district_filter_set = get_district_filter_set(house.value, district)
     query = build_contrib_records_query(
-        start_date, end_date, limit, offset, district_filter_set
+        start_date, end_date, limit, offset, district_filter_set, count=count
+    )
+    raw_res = search_records(
+        es,
+        query,
+        get_contrib_index_from_state_code(state_code, start_date, end_date),
+        count,
     )
-    raw_res = es.search(query, get_contrib_index_from_state_code(state_code))
 
-    return serialize_records_result(raw_res, start_date, end_date, offset, limit)
+    return serialize_records(
+        raw_res, Contributions, format, start_date, end_date, offset, limit
+    )
 
 
-@app.get("/{state_code}/{house}/{district}/reports", response_model=Reports)
-async def get_seat_report_records(
+@app.get(
+    "/{state_code}/{house}/{district}/contribs/count",
+    response_model=RecordCount,
+    dependencies=[Depends(admit(CostClass.entity_summary))],
+)
+def get_seat_contrib_count(
+    state_code: StateCode,
+    house: HouseLevel,
+    district: str,
+    start_date: Optional[datetime.date] = DEFAULT_START_DATE,
+    end_date: Optional[datetime.date] = datetime.date.today(),
+    es: Elasticsearch = Depends(get_request_es),
+):
+    district_filter_set = get_district_filter_set(house.value, district)
+    query = build_contrib_records_query(
+        start_date, end_date, filters=district_filter_set
+    )
+    return count_records(
+        es,
+        query,
+        get_contrib_index_from_state_code(state_code, start_date, end_date),
+        start_date,
+        end_date,
+    )
+
+
+@app.get(
+    "/{state_code}/{house}/{district}/reports",
+    response_model=Reports,
+    dependencies=[Depends(admit(CostClass.record_page))],
+)
+def get_seat_report_records(
     state_code: StateCode,
     house: HouseLevel,
     district: str,
@@ -323,12 +1017,47 @@ async def get_seat_report_records(
     end_date: Optional[datetime.date] = datetime.date.today(),
     limit: Optional[int] = DEFAULT_LIMIT,
     offset: Optional[int] = 0,
-    es: Elasticsearch = Depends(get_es),
+    count: Optional[CountMode] = CountMode.exact,
+    format: Optional[RecordFormat] = RecordFormat.rows,
+    es: Elasticsearch = Depends(get_request_es),
 ):
     district_filter_set = get_district_filter_set(house.value, district)
     query = build_report_records_query(
-        start_date, end_date, limit, offset, district_filter_set
+        start_date, end_date, limit, offset, district_filter_set, count=count
+    )
+    raw_res = search_records(
+        es,
+        query,
+        get_report_index_from_state_code(state_code, start_date, end_date),
+        count,
     )
-    raw_res = es.search(query, get_report_index_from_state_code(state_code))
 
-    return serialize_records_result(raw_res, start_date, end_date, offset, limit)
+    return serialize_records(
+        raw_res, Reports, format, start_date, end_date, offset, limit
+    )
+
+
+@app.get(
+    "/{state_code}/{house}/{district}/reports/count",
+    response_model=RecordCount,
+    dependencies=[Depends(admit(CostClass.entity_summary))],
+)
+def get_seat_report_count(
+    state_code: StateCode,
+    house: HouseLevel,
+    district: str,
+    start_date: Optional[datetime.date] = DEFAULT_START_DATE,
+    end_date: Optional[datetime.date] = datetime.date.today(),
+    es: Elasticsearch = Depends(get_request_es),
+):
+    district_filter_set = get_district_filter_set(house.value, district)
+    query = build_report_records_query(
+        start_date, end_date, filters=district_filter_set
+    )
+    return count_records(
+        es,
+        query,
+        get_report_index_from_state_code(state_code, start_date, end_date),
+        start_date,
+        end_date,
+    )
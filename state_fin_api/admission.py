@@ -0,0 +1,152 @@
+"""
+Per cost class admission control
+
+Every route is assigned a `CostClass` and each class gets its own bounded
+limiter, so a burst of expensive national aggregations queues (and is shed)
+on its own without starving cheap lookups. Requests that can't be admitted
+within the class's queue deadline, or that arrive to a full queue, get a fast
+503 with a Retry-After header instead of piling onto the ES cluster.
+"""
+
+import asyncio
+import math
+import os
+import time
+
+from fastapi import HTTPException, Request
+
+from state_fin_api.types import CostClass
+
+# (max concurrency, max queued, max queue wait in seconds) per worker
+DEFAULT_LIMITS = {
+    CostClass.national_aggregation: (2, 8, 2.0),
+    CostClass.state_aggregation: (4, 16, 2.0),
+    CostClass.entity_summary: (16, 64, 1.0),
+    CostClass.record_page: (8, 32, 1.0),
+    # Feed syncs hold their slot while the whole response streams
+    CostClass.change_feed: (2, 4, 1.0),
+}
+
+
+class AdmissionLimiter:
+    def __init__(self, name, max_concurrency, max_queued, max_queue_wait):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queued = max_queued
+        self.max_queue_wait = max_queue_wait
+
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+        # Created lazily so it binds to the server's event loop, not the import's
+        self._semaphore = None
+
+    def _reject(self, detail):
+        self.rejected += 1
+
+        raise HTTPException(
+            status_code=503,
+            detail=detail,
+            headers={"Retry-After": str(math.ceil(self.max_queue_wait))},
+        )
+
+    def _abandon(self, acquire):
+        # On 3.7 wait_for can give up just after the semaphore was acquired, so
+        # a permit that was won but will never be used is handed back
+        if acquire.done() and not acquire.cancelled():
+            self._semaphore.release()
+        else:
+            acquire.cancel()
+
+    async def acquire(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        # Decided and reserved before the first await, so a burst arriving in
+        # one loop tick is shed here rather than all queueing
+        if self.in_flight + self.queued >= self.max_concurrency + self.max_queued:
+            self._reject(f"Too many queued {self.name} requests")
+
+        start = time.monotonic()
+        self.queued += 1
+        acquire = asyncio.ensure_future(self._semaphore.acquire())
+        try:
+            await asyncio.wait_for(asyncio.shield(acquire), self.max_queue_wait)
+        except asyncio.TimeoutError:
+            self._abandon(acquire)
+            self._reject(f"Timed out waiting to run {self.name} request")
+        except asyncio.CancelledError:
+            # The client went away while queued
+            self._abandon(acquire)
+            raise
+        finally:
+            self.queued -= 1
+
+        wait = time.monotonic() - start
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.admitted += 1
+        self.in_flight += 1
+
+    def release(self):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    def get_stats(self):
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queued": self.max_queued,
+            "max_queue_wait": self.max_queue_wait,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_wait": self.total_wait / self.admitted if self.admitted else 0.0,
+            "max_wait": self.max_wait,
+        }
+
+
+def _get_limit(cost_class, setting, default):
+    return type(default)(
+        os.getenv(f"ADMISSION_{cost_class.name.upper()}_{setting}", default)
+    )
+
+
+limiters = {}
+for cost_class, (max_concurrency, max_queued, max_queue_wait) in DEFAULT_LIMITS.items():
+    limiters[cost_class] = AdmissionLimiter(
+        cost_class.value,
+        _get_limit(cost_class, "CONCURRENCY", max_concurrency),
+        _get_limit(cost_class, "QUEUE", max_queued),
+        _get_limit(cost_class, "QUEUE_WAIT", max_queue_wait),
+    )
+
+
+def admit(cost_class):
+    """Dependency that holds a slot in the class's limiter for the whole request"""
+    limiter = limiters[cost_class]
+
+    async def admit_request(request: Request):
+        # Lets the ES client dependency apply the class's timeout
+        request.state.cost_class = cost_class
+
+        await limiter.acquire()
+        try:
+            yield
+        finally:
+            limiter.release()
+
+    return admit_request
+
+
+def get_total_concurrency():
+    """Most requests a worker runs at once across every class"""
+    return sum(limiter.max_concurrency for limiter in limiters.values())
+
+
+def get_admission_stats():
+    return {cost_class.value: l.get_stats() for cost_class, l in limiters.items()}
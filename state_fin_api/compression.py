@@ -0,0 +1,203 @@
+"""
+Response compression negotiated via Accept-Encoding
+
+gzip is always available; brotli and zstd are used when the `brotli` and
+`zstandard` packages are installed. Levels are given on gzip's 1-9 scale and
+can be set per route. Summaries for the same path and query rarely change
+between hits (only ES's `took` does), so for routes marked cacheable the
+compressed body is kept for a short TTL keyed by path and query string, and
+repeat hits within it are answered with that body instead of recompressing.
+Large bodies are compressed in the threadpool to keep the event loop free.
+"""
+
+import zlib
+
+from starlette.concurrency import run_in_threadpool
+
+from state_fin_api.cache import TTLCache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+DEFAULT_MINIMUM_SIZE = 1024
+DEFAULT_LEVEL = 6
+DEFAULT_CACHE_TTL = 30
+
+# Bodies at least this big are compressed off the event loop
+THREADPOOL_MIN_SIZE = 64 * 1024
+
+
+def _compress_gzip(body, level):
+    # wbits=31 writes a gzip header (with a zero mtime) instead of a zlib one
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(body) + compressor.flush()
+
+
+def _compress_brotli(body, level):
+    # Brotli's quality goes to 11, stretch gzip levels across it
+    return brotli.compress(body, quality=min(11, level + 2))
+
+
+def _compress_zstd(body, level):
+    return zstandard.ZstdCompressor(level=level).compress(body)
+
+
+# In order of preference when the client accepts several equally
+COMPRESSORS = {}
+if brotli is not None:
+    COMPRESSORS["br"] = _compress_brotli
+if zstandard is not None:
+    COMPRESSORS["zstd"] = _compress_zstd
+COMPRESSORS["gzip"] = _compress_gzip
+
+
+def parse_accept_encoding(header):
+    accepted = {}
+
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+
+        accepted[coding.strip().lower()] = q
+
+    return accepted
+
+
+def choose_encoding(header):
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get("*", 0.0)
+
+    best, best_q = None, 0.0
+    for coding in COMPRESSORS:
+        q = accepted.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+
+    return best
+
+
+class CompressionMiddleware:
+    """
+    `route_settings` maps endpoint names to `(level, cacheable)`. Streamed
+    responses (no content-length), already encoded responses and bodies under
+    `minimum_size` are passed through untouched.
+    """
+
+    def __init__(
+        self,
+        app,
+        minimum_size=DEFAULT_MINIMUM_SIZE,
+        default_level=DEFAULT_LEVEL,
+        route_settings=None,
+        cache_size=256,
+        cache_ttl=DEFAULT_CACHE_TTL,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.default_level = default_level
+        self.route_settings = route_settings or {}
+        self.cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+
+    async def compress(self, body, encoding, level, cache_key=None):
+        if cache_key is not None:
+            cache_key = (encoding, level) + cache_key
+            compressed = self.cache.get(cache_key)
+            if compressed is not None:
+                return compressed
+
+        if len(body) >= THREADPOOL_MIN_SIZE:
+            compressed = await run_in_threadpool(COMPRESSORS[encoding], body, level)
+        else:
+            compressed = COMPRESSORS[encoding](body, level)
+
+        if cache_key is not None:
+            self.cache.set(cache_key, compressed)
+
+        return compressed
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        encoding = choose_encoding(headers.get(b"accept-encoding", b"").decode())
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        response_start = None
+        chunks = []
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal response_start, passthrough
+
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                response_headers = dict(message["headers"])
+                if (
+                    b"content-length" not in response_headers
+                    or b"content-encoding" in response_headers
+                ):
+                    passthrough = True
+                    await send(message)
+                    return
+
+                response_start = message
+                return
+
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            body = b"".join(chunks)
+            response_headers = [
+                (k, v) for k, v in response_start["headers"] if k != b"content-length"
+            ]
+
+            if len(body) >= self.minimum_size:
+                # Routing has filled in the endpoint by the time the response starts
+                endpoint = scope.get("endpoint")
+                level, cacheable = self.route_settings.get(
+                    getattr(endpoint, "__name__", None), (self.default_level, False)
+                )
+                # Profiled responses carry per-request timings, never reuse them
+                cache_key = None
+                if (
+                    cacheable
+                    and response_start["status"] == 200
+                    and scope.get("state", {}).get("profiling_es") is None
+                ):
+                    cache_key = (scope["path"], scope["query_string"])
+
+                body = await self.compress(body, encoding, level, cache_key)
+                response_headers.append((b"content-encoding", encoding.encode()))
+
+            response_headers.append((b"vary", b"Accept-Encoding"))
+            response_headers.append((b"content-length", str(len(body)).encode()))
+
+            await send(dict(response_start, headers=response_headers))
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,47 @@
+"""
+Cached exact totals for record queries
+
+Exact totals are expensive on large indices, so the first exact count of a
+filtered set of records (from a records page or its `/count` route) is cached
+by the query's signature, and later pages of the same query skip counting.
+"""
+
+import os
+
+from state_fin_api.cache import TTLCache
+from state_fin_api.query import build_count_query, get_query_signature
+from state_fin_api.serialize import serialize_count_result
+from state_fin_api.types import CountMode
+
+# Exact totals keyed by query signature so later pages can skip counting
+total_count_cache = TTLCache(maxsize=4096, ttl=int(os.getenv("COUNT_CACHE_TTL", 300)))
+
+
+def search_records(es, query, index, count):
+    """Run a records search, reusing a cached exact total when there is one"""
+    signature = get_query_signature(index, query)
+    total = total_count_cache.get(signature) if count == CountMode.exact else None
+
+    if total is not None:
+        query["track_total_hits"] = False
+
+    raw_res = es.search(query, index)
+
+    if total is not None:
+        raw_res["hits"]["total"] = {"value": total, "relation": "eq"}
+    elif count == CountMode.exact:
+        total_count_cache.set(signature, raw_res["hits"]["total"]["value"])
+
+    return raw_res
+
+
+def count_records(es, query, index, start_date, end_date):
+    signature = get_query_signature(index, query)
+    total = total_count_cache.get(signature)
+
+    cached = total is not None
+    if not cached:
+        total = es.count(build_count_query(query), index)["count"]
+        total_count_cache.set(signature, total)
+
+    return serialize_count_result(total, start_date, end_date, cached)
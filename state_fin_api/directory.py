@@ -0,0 +1,263 @@
+"""
+Host-wide store for directory data (districts, candidate and filer names)
+
+Directory data barely changes, so rather than every uvicorn worker re-running
+the aggregations and holding its own copy, one worker builds a per-state file
+and every worker memory-maps it read-only. Name lookups binary search the
+mapped tables directly so the data is never copied into each process.
+
+File layout (little endian):
+
+    header   magic, built_at, districts length, candidate count, filer count
+    districts JSON encoded `serialize_state_districts` result
+    tables   candidate id -> name, then filer id -> name
+
+Each table is `n + 1` key offsets, `n + 1` value offsets, the key blob and the
+value blob, with keys sorted by their utf-8 bytes.
+"""
+
+import bisect
+import datetime
+import fcntl
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+from state_fin_api.query import build_directory_query, DEFAULT_START_DATE
+from state_fin_api.serialize import serialize_directory
+
+logger = logging.getLogger(__name__)
+
+DIRECTORY_DIR = os.getenv(
+    "DIRECTORY_DIR", os.path.join(tempfile.gettempdir(), "state-fin-api")
+)
+DIRECTORY_TTL = int(os.getenv("DIRECTORY_TTL", 3600))
+
+MAGIC = b"SFDIR001"
+HEADER = struct.Struct("<8sdIII")
+OFFSET = struct.Struct("<I")
+
+
+def _pack_table(mapping):
+    items = sorted((k.encode("utf-8"), v.encode("utf-8")) for k, v in mapping.items())
+
+    key_offsets = [0]
+    val_offsets = [0]
+    for key, val in items:
+        key_offsets.append(key_offsets[-1] + len(key))
+        val_offsets.append(val_offsets[-1] + len(val))
+
+    n = len(key_offsets)
+    return b"".join(
+        [
+            struct.pack(f"<{n}I", *key_offsets),
+            struct.pack(f"<{n}I", *val_offsets),
+            b"".join(k for k, _ in items),
+            b"".join(v for _, v in items),
+        ]
+    )
+
+
+class _Table:
+    """Read-only view of a packed id -> name table inside a mapped buffer"""
+
+    def __init__(self, buf, pos, n):
+        self._buf = buf
+        self._n = n
+
+        self._key_offsets = pos
+        self._val_offsets = pos + (n + 1) * OFFSET.size
+        self._keys = self._val_offsets + (n + 1) * OFFSET.size
+        self._vals = self._keys + self._offset(self._key_offsets, n)
+
+        self.end = self._vals + self._offset(self._val_offsets, n)
+
+    def _offset(self, base, i):
+        return OFFSET.unpack_from(self._buf, base + i * OFFSET.size)[0]
+
+    def _key(self, i):
+        start = self._keys + self._offset(self._key_offsets, i)
+        end = self._keys + self._offset(self._key_offsets, i + 1)
+        return self._buf[start:end]
+
+    def __len__(self):
+        return self._n
+
+    def __getitem__(self, i):
+        # Lets bisect search the table without materializing the keys
+        return self._key(i)
+
+    def get(self, key):
+        key = key.encode("utf-8")
+
+        i = bisect.bisect_left(self, key, 0, self._n)
+        if i == self._n or self._key(i) != key:
+            return None
+
+        start = self._vals + self._offset(self._val_offsets, i)
+        end = self._vals + self._offset(self._val_offsets, i + 1)
+        return self._buf[start:end].decode("utf-8")
+
+
+class DirectoryStore:
+    def __init__(self, path):
+        self.path = path
+
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self._signature = (stat.st_ino, stat.st_mtime_ns)
+
+        magic, built_at, districts_len, n_candidates, n_filers = HEADER.unpack_from(
+            self._mm, 0
+        )
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a directory file")
+
+        self.built_at = built_at
+
+        self._districts_pos = HEADER.size
+        self._districts_len = districts_len
+        self._districts = None
+
+        self.candidates = _Table(self._mm, HEADER.size + districts_len, n_candidates)
+        self.filers = _Table(self._mm, self.candidates.end, n_filers)
+
+    @property
+    def districts(self):
+        if self._districts is None:
+            start = self._districts_pos
+            raw = self._mm[start : start + self._districts_len]
+            self._districts = json.loads(raw)
+
+        return self._districts
+
+    def is_current(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+
+        return (stat.st_ino, stat.st_mtime_ns) == self._signature
+
+    def covers(self, start_date, end_date):
+        """
+        Whether the directory's districts stand in for a districts agg over the
+        range: it lists every district seen from the default start date up to
+        when it was built, so the range has to span exactly that (or run past it)
+        """
+        return start_date == DEFAULT_START_DATE and end_date >= (
+            datetime.date.fromtimestamp(self.built_at)
+        )
+
+    def is_stale(self, ttl=DIRECTORY_TTL):
+        return time.time() - self.built_at > ttl
+
+    def candidate_name(self, candidate_id):
+        return self.candidates.get(candidate_id)
+
+    def filer_name(self, filer_id):
+        return self.filers.get(filer_id)
+
+
+def get_directory_path(state_code):
+    # Read per call since main only loads .env after importing this module.
+    # Deployments for different envs on one host each get their own files.
+    env = os.getenv("API_ENV", "dev")
+    return os.path.join(DIRECTORY_DIR, f"{state_code}_{env}_directory.bin")
+
+
+def write_directory(path, directory):
+    districts = json.dumps(directory["districts"]).encode("utf-8")
+
+    data = b"".join(
+        [
+            HEADER.pack(
+                MAGIC,
+                time.time(),
+                len(districts),
+                len(directory["candidates"]),
+                len(directory["filers"]),
+            ),
+            districts,
+            _pack_table(directory["candidates"]),
+            _pack_table(directory["filers"]),
+        ]
+    )
+
+    # Write to a temp file and swap it in so readers never see a partial file.
+    # Existing mappings keep pointing at the old inode until they remap.
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+_stores = {}
+
+
+def get_directory(state_code):
+    """Return the mapped directory for a state, or None if none has been built"""
+    path = get_directory_path(state_code)
+
+    store = _stores.get(path)
+    if store is None or not store.is_current():
+        try:
+            store = DirectoryStore(path)
+        except (FileNotFoundError, ValueError, struct.error):
+            return None
+        _stores[path] = store
+
+    return store
+
+
+def refresh_directory(es, state_code, index, ttl=DIRECTORY_TTL):
+    """
+    Rebuild the directory for a state if it is missing or stale
+
+    Only the worker that wins the lock does the rebuild; everyone else returns
+    immediately and keeps serving from the existing file.
+    """
+    path = get_directory_path(state_code)
+    os.makedirs(DIRECTORY_DIR, exist_ok=True)
+
+    with open(path + ".lock", "w") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+
+        # Another worker may have finished a rebuild while we were waiting
+        store = get_directory(state_code)
+        if store is not None and not store.is_stale(ttl):
+            return False
+
+        raw_res = es.search(build_directory_query(), index)
+        write_directory(path, serialize_directory(raw_res))
+
+        return True
+
+
+def start_directory_refresher(get_es, state_codes, get_index, ttl=DIRECTORY_TTL):
+    def run():
+        while True:
+            for state_code in state_codes:
+                try:
+                    refresh_directory(get_es(), state_code, get_index(state_code), ttl)
+                except Exception:
+                    logger.exception(f"Failed to refresh directory for {state_code}")
+
+            # Check well before expiry so a dead refresher is noticed quickly
+            time.sleep(max(ttl / 4, 1))
+
+    thread = threading.Thread(target=run, name="directory-refresher", daemon=True)
+    thread.start()
+
+    return thread
@@ -1,18 +1,91 @@
 import os
 from elasticsearch import Elasticsearch
 
+from state_fin_api.admission import get_total_concurrency
+from state_fin_api.es.connection import (
+    LatencyAwareSelector,
+    LatencyTrackingConnection,
+    NO_RETRY_ON_TIMEOUT,
+)
+from state_fin_api.types import CostClass
+
 
 es = None
 
+# (request timeout in seconds, retry on timeout) per cost class. National
+# aggregations are allowed to run long, but a timeout there is the query's
+# cost, not a bad node, so retrying elsewhere would only double the load
+DEFAULT_REQUEST_OPTIONS = {
+    CostClass.national_aggregation: (30.0, False),
+    CostClass.state_aggregation: (15.0, True),
+    CostClass.entity_summary: (5.0, True),
+    CostClass.record_page: (5.0, True),
+    CostClass.change_feed: (10.0, True),
+}
+
+
+def get_es_hosts():
+    # ES_HOSTS takes a comma separated list, ES_HOST is kept for single nodes
+    hosts = os.getenv("ES_HOSTS") or os.getenv("ES_HOST")
+    if not hosts:
+        return None
+
+    return [h.strip() for h in hosts.split(",") if h.strip()]
+
 
 def get_es():
     global es
     if es is None:
-        es = Elasticsearch(hosts=[os.getenv("ES_HOST")])
+        es = Elasticsearch(
+            hosts=get_es_hosts(),
+            connection_class=LatencyTrackingConnection,
+            selector_class=LatencyAwareSelector,
+            # Keep-alive connections per node, per worker. Defaults to the most
+            # requests admission lets run at once, so concurrent requests don't
+            # open throwaway connections
+            maxsize=int(os.getenv("ES_POOL_SIZE", get_total_concurrency())),
+            timeout=float(os.getenv("ES_TIMEOUT", 10)),
+            # The API only reads, so every request is safe to retry elsewhere
+            max_retries=int(os.getenv("ES_MAX_RETRIES", 2)),
+            retry_on_timeout=True,
+            # Seconds a failed node is ejected for, doubling on repeat failures
+            dead_timeout=float(os.getenv("ES_DEAD_TIMEOUT", 30)),
+        )
 
     return es
 
 
+def get_request_timeout(cost_class):
+    timeout, _ = DEFAULT_REQUEST_OPTIONS[cost_class]
+    return float(os.getenv(f"ES_{cost_class.name.upper()}_TIMEOUT", timeout))
+
+
+class RequestOptionsElasticsearch:
+    """Applies a cost class's timeout and retry policy to searches and counts"""
+
+    def __init__(self, es, cost_class):
+        self._es = es
+        self.request_timeout = get_request_timeout(cost_class)
+        self.retry_on_timeout = DEFAULT_REQUEST_OPTIONS[cost_class][1]
+
+    def _with_options(self, kwargs):
+        kwargs.setdefault("request_timeout", self.request_timeout)
+        if not self.retry_on_timeout:
+            kwargs["params"] = dict(kwargs.get("params") or {})
+            kwargs["params"][NO_RETRY_ON_TIMEOUT] = True
+
+        return kwargs
+
+    def search(self, body=None, index=None, **kwargs):
+        return self._es.search(body, index, **self._with_options(kwargs))
+
+    def count(self, body=None, index=None, **kwargs):
+        return self._es.count(body, index, **self._with_options(kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._es, name)
+
+
 def get_supported_states():
     es = get_es()
 
@@ -0,0 +1,116 @@
+"""
+Latency aware node selection for the ES client
+
+Each connection keeps an exponentially weighted moving average of its request
+latency, and the selector picks the faster of two random live nodes ("power
+of two choices"), which steers load away from slow nodes without piling every
+worker onto the single fastest one. Dead nodes are ejected and retried with
+backoff by the client's own `ConnectionPool`.
+
+The client only has a global `retry_on_timeout`, so a request can opt out of
+retrying with the `NO_RETRY_ON_TIMEOUT` param. Its timeout is then raised as a
+`RequestTimeout`, which the transport doesn't retry or count against the node.
+"""
+
+import random
+import threading
+import time
+
+from elasticsearch import ConnectionSelector, Urllib3HttpConnection
+from elasticsearch.exceptions import ConnectionError, ConnectionTimeout, TransportError
+
+# Weight of the newest sample in the latency average
+LATENCY_EWMA_ALPHA = 0.3
+
+# Request param, stripped before the request is sent
+NO_RETRY_ON_TIMEOUT = "no_retry_on_timeout"
+
+
+class RequestTimeout(TransportError):
+    """Timeout of a request that opted out of being retried on another node"""
+
+
+class LatencyTrackingConnection(Urllib3HttpConnection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self.latency_ewma = None
+        self.requests = 0
+        self.failures = 0
+
+        self._stats_lock = threading.Lock()
+
+    def _record(self, latency, failed):
+        with self._stats_lock:
+            self.requests += 1
+
+            if failed:
+                # Forget the history so the node is probed promptly once the
+                # pool resurrects it, instead of being avoided for being slow
+                self.failures += 1
+                self.latency_ewma = None
+            elif self.latency_ewma is None:
+                self.latency_ewma = latency
+            else:
+                self.latency_ewma += LATENCY_EWMA_ALPHA * (latency - self.latency_ewma)
+
+    def perform_request(self, method, url, params=None, *args, **kwargs):
+        retry_on_timeout = True
+        if params and NO_RETRY_ON_TIMEOUT in params:
+            params = dict(params)
+            retry_on_timeout = not params.pop(NO_RETRY_ON_TIMEOUT)
+
+        start = time.monotonic()
+        try:
+            res = super().perform_request(method, url, params, *args, **kwargs)
+        except ConnectionTimeout as e:
+            if retry_on_timeout:
+                self._record(time.monotonic() - start, failed=True)
+                raise
+
+            # A slow query rather than a dead node, so it counts as a sample
+            self._record(time.monotonic() - start, failed=False)
+            raise RequestTimeout("TIMEOUT", str(e), e)
+        except ConnectionError:
+            self._record(time.monotonic() - start, failed=True)
+            raise
+
+        self._record(time.monotonic() - start, failed=False)
+        return res
+
+
+def _get_latency_score(connection):
+    # Nodes without samples yet are tried first
+    return getattr(connection, "latency_ewma", None) or 0.0
+
+
+class LatencyAwareSelector(ConnectionSelector):
+    def select(self, connections):
+        candidates = random.sample(connections, 2)
+        return min(candidates, key=_get_latency_score)
+
+
+def get_connection_stats(es):
+    pool = es.transport.connection_pool
+
+    live = set(pool.connections)
+    stats = []
+    for connection in getattr(pool, "orig_connections", pool.connections):
+        http_pool = getattr(connection, "pool", None)
+        latency = getattr(connection, "latency_ewma", None)
+
+        stats.append(
+            {
+                "host": connection.host,
+                "alive": connection in live,
+                "dead_count": getattr(pool, "dead_count", {}).get(connection, 0),
+                "latency_ms": latency * 1000 if latency is not None else None,
+                "requests": getattr(connection, "requests", 0),
+                "failures": getattr(connection, "failures", 0),
+                "pool_maxsize": http_pool.pool.maxsize if http_pool else 0,
+                "pool_available": http_pool.pool.qsize() if http_pool else 0,
+                "connections_opened": http_pool.num_connections if http_pool else 0,
+            }
+        )
+
+    return stats
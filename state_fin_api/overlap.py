@@ -0,0 +1,145 @@
+"""
+Donor overlap between candidates
+
+Each candidate's contributors are reduced to a sorted array of 64-bit
+contributor ids (a hash of normalized name and ZIP5) with a parallel array of
+the total each gave. The arrays are built from a composite aggregation, so
+ES does the per-contributor summing, and are cached, after which pairwise or
+matrix intersections are computed in memory. Pair results are cached too, keyed
+by the serials of the two sets, so a repeat matrix over cached sets is only
+lookups.
+"""
+
+import hashlib
+import itertools
+import os
+from array import array
+
+from state_fin_api.cache import TTLCache
+from state_fin_api.query import (
+    build_contributor_totals_query,
+    CONTRIBUTOR_PAGE_SIZE,
+)
+
+CONTRIBUTOR_SET_TTL = int(os.getenv("CONTRIBUTOR_SET_TTL", 3600))
+
+_contributor_sets = TTLCache(maxsize=512, ttl=CONTRIBUTOR_SET_TTL)
+
+# A rebuilt set gets a new serial, so stale pairs are never hit and just expire
+_pair_overlaps = TTLCache(maxsize=50000, ttl=CONTRIBUTOR_SET_TTL)
+_serials = itertools.count()
+
+
+def hash_contributor(name, zip):
+    key = f"{(name or '').strip().upper()}|{(zip or '').strip()[:5]}"
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+class ContributorSet:
+    def __init__(self, totals_by_id):
+        ids = sorted(totals_by_id)
+
+        self.ids = array("q", ids)
+        self.amounts = array("d", (totals_by_id[i] for i in ids))
+        self.serial = next(_serials)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def total_amount(self):
+        return sum(self.amounts)
+
+    def as_dict(self):
+        return dict(zip(self.ids, self.amounts))
+
+
+def build_contributor_set(es, index, filters, start_date, end_date):
+    totals_by_id = {}
+
+    after = None
+    while True:
+        query = build_contributor_totals_query(start_date, end_date, filters, after)
+        agg = es.search(query, index)["aggregations"]["contributors"]
+
+        for bucket in agg["buckets"]:
+            # Names differing only in case/whitespace collapse to one contributor
+            contributor_id = hash_contributor(
+                bucket["key"]["name"], bucket["key"]["zip"]
+            )
+            totals_by_id[contributor_id] = (
+                totals_by_id.get(contributor_id, 0) + bucket["total_amount"]["value"]
+            )
+
+        after = agg.get("after_key")
+        if len(agg["buckets"]) < CONTRIBUTOR_PAGE_SIZE or after is None:
+            break
+
+    return ContributorSet(totals_by_id)
+
+
+def get_contributor_set(es, index, candidate_id, filters, start_date, end_date):
+    key = (index, candidate_id, str(start_date), str(end_date))
+
+    contributor_set = _contributor_sets.get(key)
+    if contributor_set is None:
+        contributor_set = build_contributor_set(
+            es, index, filters, start_date, end_date
+        )
+        _contributor_sets.set(key, contributor_set)
+
+    return contributor_set
+
+
+def _expand(contributor_set):
+    # frozenset & frozenset walks the smaller side in C, where dict key views
+    # would copy one side into a new set on every pair
+    return frozenset(contributor_set.ids), contributor_set.as_dict()
+
+
+def _intersect_totals(a, b):
+    a_ids, a_totals = a
+    b_ids, b_totals = b
+
+    shared = a_ids & b_ids
+    union = len(a_ids) + len(b_ids) - len(shared)
+
+    return {
+        "shared_contributors": len(shared),
+        "shared_amount_a": sum(map(a_totals.__getitem__, shared)),
+        "shared_amount_b": sum(map(b_totals.__getitem__, shared)),
+        "jaccard": len(shared) / union if union else 0.0,
+    }
+
+
+def intersect_contributor_sets(a, b, expand=_expand):
+    """Overlap between two sets, cached by their serials"""
+    key = (a.serial, b.serial)
+
+    overlap = _pair_overlaps.get(key)
+    if overlap is None:
+        overlap = _intersect_totals(expand(a), expand(b))
+        _pair_overlaps.set(key, overlap)
+
+    return overlap
+
+
+def get_overlap_matrix(contributor_sets):
+    """Pairwise overlap for every pair in a dict of candidate id -> set"""
+    # Sets are expanded at most once per request, and only when one of their
+    # pairs isn't cached, so the cached sets themselves stay compact
+    expanded = {}
+
+    def get_expanded(contributor_set):
+        if contributor_set.serial not in expanded:
+            expanded[contributor_set.serial] = _expand(contributor_set)
+        return expanded[contributor_set.serial]
+
+    pairs = []
+    for (id_a, a), (id_b, b) in itertools.combinations(contributor_sets.items(), 2):
+        pair = {"candidate_a": id_a, "candidate_b": id_b}
+        pair.update(intersect_contributor_sets(a, b, get_expanded))
+        pairs.append(pair)
+
+    return pairs
@@ -0,0 +1,118 @@
+"""
+Time-partitioned index routing
+
+Indices may be split by year, e.g. `tx_contribs_prod_2020`, alongside or
+instead of the single `tx_contribs_prod` index. The partitions that exist are
+discovered at startup (and refreshed periodically) and `plan_index` maps a
+base index name plus a date range onto only the partitions that overlap it.
+Bases with no partitions are searched as-is, and wildcard bases keep matching
+the unpartitioned indices of states that haven't been split yet.
+"""
+
+import fnmatch
+import logging
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+PARTITION_RE = re.compile(r"^(?P<base>.+)_(?P<year>\d{4})$")
+
+# Base index name -> sorted partition years
+_partitions = {}
+
+# Indices that aren't split by year, e.g. `tx_contribs_prod`
+_unpartitioned = []
+
+
+def discover_partitions(es, env):
+    global _partitions, _unpartitioned
+
+    res = es.indices.get_alias(
+        index=f"*_contribs_{env},*_reports_{env},*_contribs_{env}_*,*_reports_{env}_*"
+    )
+
+    partitions = {}
+    unpartitioned = []
+    for index in res.keys():
+        match = PARTITION_RE.match(index)
+        if match:
+            years = partitions.setdefault(match.group("base"), [])
+            years.append(int(match.group("year")))
+        else:
+            unpartitioned.append(index)
+
+    # Swapped in whole so readers never see a half built map
+    _partitions = {base: sorted(years) for base, years in partitions.items()}
+    _unpartitioned = sorted(
+        index for index in unpartitioned if index not in _partitions
+    )
+
+    return _partitions
+
+
+def get_partition_years(base):
+    if "*" not in base:
+        return _partitions.get(base, [])
+
+    years = set()
+    for partitioned_base, base_years in _partitions.items():
+        if fnmatch.fnmatchcase(partitioned_base, base):
+            years.update(base_years)
+
+    return sorted(years)
+
+
+def get_unpartitioned_indices(base):
+    """Indices matching a wildcard base that have no year partitions"""
+    return [index for index in _unpartitioned if fnmatch.fnmatchcase(index, base)]
+
+
+def plan_index(base, start_date=None, end_date=None):
+    years = get_partition_years(base)
+    if not years:
+        return base
+
+    # A wildcard base with year suffixes no longer matches states that are
+    # still a single index, so those are listed explicitly
+    unpartitioned = get_unpartitioned_indices(base) if "*" in base else []
+
+    if start_date is None and end_date is None:
+        return ",".join([f"{base}_*"] + unpartitioned)
+
+    selected = [
+        year
+        for year in years
+        if (start_date is None or year >= start_date.year)
+        and (end_date is None or year <= end_date.year)
+    ]
+
+    if not selected and not unpartitioned:
+        # Search the closest partition so the query still runs (and matches
+        # nothing) rather than failing on an empty index list
+        past_end = start_date is not None and start_date.year > years[-1]
+        selected = [years[-1] if past_end else years[0]]
+
+    return ",".join([f"{base}_{year}" for year in selected] + unpartitioned)
+
+
+def start_partition_refresher(get_es, env, interval):
+    def refresh():
+        try:
+            discover_partitions(get_es(), env)
+        except Exception:
+            logger.exception("Failed to discover index partitions")
+
+    def run():
+        while True:
+            time.sleep(interval)
+            refresh()
+
+    # The first discovery is done up front so early requests are routed well
+    refresh()
+
+    thread = threading.Thread(target=run, name="partition-refresher", daemon=True)
+    thread.start()
+
+    return thread
@@ -0,0 +1,172 @@
+"""
+Opt-in query profiling
+
+`ProfilingElasticsearch` wraps the client for a single request, sends every
+search with `"profile": true` and keeps the exact body that was sent along
+with a condensed timing tree. ES reports a tree per shard, so nodes with the
+same type and description are merged across shards. Counts can't be profiled,
+so they're recorded with their body and round trip time only.
+"""
+
+import json
+import time
+
+from fastapi.encoders import jsonable_encoder
+
+
+def _merge_profile_nodes(merged, nodes, label_key):
+    for node in nodes:
+        key = (node["type"], node[label_key])
+
+        if key not in merged:
+            merged[key] = {
+                "type": node["type"],
+                "description": node[label_key],
+                "time_in_nanos": 0,
+                "max_shard_time_in_nanos": 0,
+                "children": {},
+            }
+
+        entry = merged[key]
+        entry["time_in_nanos"] += node["time_in_nanos"]
+        entry["max_shard_time_in_nanos"] = max(
+            entry["max_shard_time_in_nanos"], node["time_in_nanos"]
+        )
+
+        _merge_profile_nodes(entry["children"], node.get("children", []), label_key)
+
+
+def _finalize_profile_nodes(merged):
+    nodes = []
+
+    for entry in merged.values():
+        nodes.append(
+            {
+                "type": entry["type"],
+                "description": entry["description"],
+                "time_ms": entry["time_in_nanos"] / 1e6,
+                "max_shard_time_ms": entry["max_shard_time_in_nanos"] / 1e6,
+                "children": _finalize_profile_nodes(entry["children"]),
+            }
+        )
+
+    # Most expensive first so the culprit is at the top of each level
+    return sorted(nodes, key=lambda n: n["time_ms"], reverse=True)
+
+
+def condense_profile(profile):
+    queries = {}
+    aggregations = {}
+
+    shards = profile.get("shards", [])
+    for shard in shards:
+        for search in shard.get("searches", []):
+            _merge_profile_nodes(queries, search.get("query", []), "description")
+        _merge_profile_nodes(aggregations, shard.get("aggregations", []), "description")
+
+    return {
+        "shards": len(shards),
+        "query": _finalize_profile_nodes(queries),
+        "aggregations": _finalize_profile_nodes(aggregations),
+    }
+
+
+class ProfilingElasticsearch:
+    def __init__(self, es):
+        self._es = es
+        self.searches = []
+
+    def search(self, body=None, index=None, **kwargs):
+        body = dict(body or {}, profile=True)
+
+        raw_res = self._es.search(body, index, **kwargs)
+
+        self.searches.append(
+            {
+                "api": "search",
+                "index": index,
+                "body": body,
+                "took": raw_res["took"],
+                "profile": condense_profile(raw_res.pop("profile", {})),
+            }
+        )
+
+        return raw_res
+
+    def count(self, body=None, index=None, **kwargs):
+        start = time.monotonic()
+        raw_res = self._es.count(body, index, **kwargs)
+
+        self.searches.append(
+            {
+                "api": "count",
+                "index": index,
+                "body": body,
+                "took": round((time.monotonic() - start) * 1000),
+                "profile": None,
+            }
+        )
+
+        return raw_res
+
+    def __getattr__(self, name):
+        # Everything else (indices, ...) goes straight through
+        return getattr(self._es, name)
+
+
+class DebugProfileMiddleware:
+    """
+    Attaches the searches recorded by a request's `ProfilingElasticsearch` to
+    its JSON response under `debug`. Requests that aren't profiled are passed
+    through untouched.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        response_start = None
+        chunks = []
+        passthrough = False
+
+        async def send_with_profile(message):
+            nonlocal response_start, passthrough
+
+            # Set on the request state by the dependency that created it
+            profiling_es = scope.get("state", {}).get("profiling_es")
+            if profiling_es is None or passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                # Streamed responses (e.g. NDJSON) can't carry a debug object
+                content_type = dict(message["headers"]).get(b"content-type", b"")
+                if not content_type.startswith(b"application/json"):
+                    passthrough = True
+                    await send(message)
+                    return
+
+                response_start = message
+                return
+
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            content = json.loads(b"".join(chunks))
+            content["debug"] = {"searches": jsonable_encoder(profiling_es.searches)}
+            body = json.dumps(content).encode("utf-8")
+
+            headers = [
+                (k, v) for k, v in response_start["headers"] if k != b"content-length"
+            ]
+            headers.append((b"content-length", str(len(body)).encode("latin-1")))
+
+            await send(dict(response_start, headers=headers))
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_with_profile)
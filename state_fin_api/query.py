@@ -1,8 +1,33 @@
 import datetime
 import copy
+import hashlib
+import json
+import os
 
 DEFAULT_LIMIT = 500
 
+# Totals are exact up to this many hits when an approximate count is requested
+APPROX_TOTAL_HITS = 10000
+
+DEFAULT_ZIP_LIMIT = 10
+MAX_ZIP_LIMIT = 1000
+
+# Keyword fields holding precomputed ZIP prefixes. When they aren't set the
+# prefixes are computed from `zip` with a script, which is much slower.
+ZIP_PREFIX_FIELDS = {3: os.getenv("ZIP3_FIELD"), 5: os.getenv("ZIP5_FIELD")}
+
+ZIP_PREFIX_SCRIPT = """
+if (doc['zip.keyword'].size() == 0) { return null; }
+String zip = doc['zip.keyword'].value;
+return zip.length() < params.length ? null : zip.substring(0, params.length);
+"""
+
+# Contributor buckets fetched per page when building donor sets
+CONTRIBUTOR_PAGE_SIZE = 5000
+
+# Upper bound on the number of candidates/filers in a single state's directory
+DIRECTORY_SIZE = 10000
+
 DEFAULT_START_DATE = datetime.datetime.strptime("2019-01-01", "%Y-%m-%d").date()
 
 DEFAULT_CONTRIB_SUMMARY_QUERY = {
@@ -69,6 +94,7 @@ def build_contrib_records_query(
     size=DEFAULT_LIMIT,
     offset=0,
     filters=[],
+    count="exact",
 ):
     query = copy.deepcopy(DEFAULT_CONTRIB_RECORDS_QUERY)
 
@@ -76,6 +102,8 @@ def build_contrib_records_query(
     query["size"] = size
     query["from"] = offset
 
+    query["track_total_hits"] = get_track_total_hits(count)
+
     # Add time range
     query["query"]["bool"]["filter"].append(
         {"range": {"contribution_date": {"gte": start_date, "lte": end_date}}}
@@ -92,6 +120,7 @@ def build_report_records_query(
     size=DEFAULT_LIMIT,
     offset=0,
     filters=[],
+    count="exact",
 ):
     query = copy.deepcopy(DEFAULT_REPORT_RECORDS_QUERY)
 
@@ -99,6 +128,8 @@ def build_report_records_query(
     query["size"] = size
     query["from"] = offset
 
+    query["track_total_hits"] = get_track_total_hits(count)
+
     # Add time range
     query["query"]["bool"]["filter"].append(
         {"range": {"received_date": {"gte": start_date, "lte": end_date}}}
@@ -109,6 +140,104 @@ def build_report_records_query(
     return query
 
 
+def get_track_total_hits(count):
+    if count == "none":
+        return False
+
+    if count == "approx":
+        return APPROX_TOTAL_HITS
+
+    return True
+
+
+def build_count_query(records_query):
+    return {"query": copy.deepcopy(records_query["query"])}
+
+
+def get_query_signature(index, query):
+    """Identify a filtered set of records independent of paging and sorting"""
+    raw = json.dumps(
+        {"index": index, "query": query["query"]}, sort_keys=True, default=str
+    )
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def build_changes_query(
+    timestamp_field, tiebreak_field, after=None, through=None, size=DEFAULT_LIMIT
+):
+    """Page through an index in ingest order, resuming after a sort position"""
+    query = {
+        "size": size,
+        "track_total_hits": False,
+        "sort": [
+            {timestamp_field: {"order": "asc"}},
+            {tiebreak_field: {"order": "asc"}},
+        ],
+        "query": {"bool": {"filter": []}},
+    }
+
+    if after is not None:
+        query["search_after"] = after
+
+    if through is not None:
+        query["query"]["bool"]["filter"].append(
+            {"range": {timestamp_field: {"lte": through}}}
+        )
+
+    return query
+
+
+def build_contributor_totals_query(
+    start_date=DEFAULT_START_DATE,
+    end_date=None,
+    filters=[],
+    after=None,
+    size=CONTRIBUTOR_PAGE_SIZE,
+):
+    """Page through total contributions per contributor (name and ZIP)"""
+    query = {
+        "size": 0,
+        "aggs": {
+            "contributors": {
+                "composite": {
+                    "size": size,
+                    "sources": [
+                        {"name": {"terms": {"field": "name.keyword"}}},
+                        {
+                            "zip": {
+                                "terms": {
+                                    "field": "zip.keyword",
+                                    "missing_bucket": True,
+                                }
+                            }
+                        },
+                    ],
+                },
+                "aggs": {"total_amount": {"sum": {"field": "amount"}}},
+            }
+        },
+        "query": {"bool": {"filter": []}},
+    }
+
+    if after is not None:
+        query["aggs"]["contributors"]["composite"]["after"] = after
+
+    query["query"]["bool"]["filter"].append(
+        {
+            "range": {
+                "contribution_date": {
+                    "gte": start_date,
+                    "lte": end_date or datetime.datetime.now(),
+                }
+            }
+        }
+    )
+
+    query["query"]["bool"]["filter"].extend(filters)
+
+    return query
+
+
 def get_available_districts_aggs():
     return {
         "districts_by_house": {
@@ -126,31 +255,119 @@ def get_available_districts_aggs():
     }
 
 
-def get_candidates_for_district_aggs():
-    return {
+def get_candidates_for_district_aggs(include_names=True):
+    aggs = {
         "candidates": {
             "terms": {"field": "candidate.candidate_id.keyword", "size": 150},
             "aggs": {
                 "candidate_stats": {"stats": {"field": "amount"}},
-                "candidate_name": {
-                    "terms": {"field": "candidate.name.keyword", "size": 1}
-                },
             },
         }
     }
 
+    # Names can be skipped when they'll be looked up from the directory instead
+    if include_names:
+        aggs["candidates"]["aggs"]["candidate_name"] = {
+            "terms": {"field": "candidate.name.keyword", "size": 1}
+        }
 
-def get_associated_filers_aggs():
-    return {
+    return aggs
+
+
+def get_associated_filers_aggs(include_names=True):
+    aggs = {
         "associated_filers": {
             "terms": {"field": "filer.filer_id.keyword", "size": 10},
             "aggs": {
                 "filer_stats": {"stats": {"field": "amount"}},
-                "filer_name": {"terms": {"field": "filer.name.keyword", "size": 10}},
             },
         }
     }
 
+    if include_names:
+        aggs["associated_filers"]["aggs"]["filer_name"] = {
+            "terms": {"field": "filer.name.keyword", "size": 10}
+        }
+
+    return aggs
+
+
+def build_directory_query(start_date=DEFAULT_START_DATE, end_date=None):
+    """Query for every district, candidate name and filer name in an index"""
+    query = {
+        "size": 0,
+        "aggs": get_available_districts_aggs(),
+        "query": {"bool": {"filter": []}},
+    }
+
+    query["query"]["bool"]["filter"].append(
+        {
+            "range": {
+                "contribution_date": {
+                    "gte": start_date,
+                    "lte": end_date or datetime.datetime.now(),
+                }
+            }
+        }
+    )
+
+    query["aggs"]["directory_candidates"] = {
+        "terms": {"field": "candidate.candidate_id.keyword", "size": DIRECTORY_SIZE},
+        "aggs": {"name": {"terms": {"field": "candidate.name.keyword", "size": 1}}},
+    }
+    query["aggs"]["directory_filers"] = {
+        "terms": {"field": "filer.filer_id.keyword", "size": DIRECTORY_SIZE},
+        "aggs": {"name": {"terms": {"field": "filer.name.keyword", "size": 1}}},
+    }
+
+    return query
+
+
+def get_zip_prefix_terms(length, size):
+    field = ZIP_PREFIX_FIELDS.get(length)
+    if field:
+        return {"field": field, "size": size}
+
+    return {
+        "script": {
+            "source": ZIP_PREFIX_SCRIPT,
+            "lang": "painless",
+            "params": {"length": length},
+        },
+        "size": size,
+    }
+
+
+def get_geo_aggs(state_code, zip_limit=DEFAULT_ZIP_LIMIT):
+    # Contributor states aren't consistently cased across sources
+    home_state = {"terms": {"state.keyword": [state_code.upper(), state_code.lower()]}}
+    has_state = {"exists": {"field": "state.keyword"}}
+
+    stats = {"stats": {"field": "amount"}}
+
+    return {
+        "residency": {
+            "filters": {
+                "filters": {
+                    "in_state": home_state,
+                    "out_of_state": {
+                        "bool": {"filter": [has_state], "must_not": [home_state]}
+                    },
+                    "unknown": {"bool": {"must_not": [has_state]}},
+                }
+            },
+            "aggs": {"residency_stats": stats},
+        },
+        "zip3": {
+            "terms": get_zip_prefix_terms(3, zip_limit),
+            "aggs": {"zip_stats": stats},
+        },
+        "zip5": {
+            "terms": get_zip_prefix_terms(5, zip_limit),
+            "aggs": {"zip_stats": stats},
+        },
+    }
+
 
 def get_district_filter_set(house, district):
     return [
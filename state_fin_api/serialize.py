@@ -1,4 +1,7 @@
+import functools
+
 import humps
+from fastapi.encoders import jsonable_encoder
 
 
 def serialize_contrib_summary_result(raw_result, start_date, end_date):
@@ -36,19 +39,100 @@ def serialize_contrib_summary_result(raw_result, start_date, end_date):
     }
 
 
+def _serialize_records_query(raw_result, start_date, end_date, offset, limit):
+    # Total is left out of the ES response when counting is disabled
+    total = raw_result["hits"].get("total")
+
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "offset": offset,
+        "limit": limit,
+        "timed_out": raw_result["timed_out"],
+        "took": raw_result["took"],
+        "total": total["value"] if total else None,
+        "total_relation": total["relation"] if total else None,
+        "hits": len(raw_result["hits"]["hits"]),
+    }
+
+
 def serialize_records_result(raw_result, start_date, end_date, offset, limit):
     return {
         "records": [humps.decamelize(h["_source"]) for h in raw_result["hits"]["hits"]],
-        "query": {
-            "start_date": start_date,
-            "end_date": end_date,
-            "offset": offset,
-            "limit": limit,
-            "timed_out": raw_result["timed_out"],
-            "took": raw_result["took"],
-            "total": raw_result["hits"]["total"]["value"],
-            "hits": len(raw_result["hits"]["hits"]),
-        },
+        "query": _serialize_records_query(
+            raw_result, start_date, end_date, offset, limit
+        ),
+    }
+
+
+@functools.lru_cache(maxsize=256)
+def _decamelize_key(key):
+    return humps.decamelize(key)
+
+
+def _encode_entity(value, table, index_by_key):
+    if not value:
+        return None
+
+    # Filers and candidates are flat so their items identify them
+    key = tuple(value.items())
+    if key not in index_by_key:
+        index_by_key[key] = len(table)
+        table.append(humps.decamelize(value))
+
+    return index_by_key[key]
+
+
+def serialize_columnar_records_result(
+    raw_result, fields, query_model, start_date, end_date, offset, limit
+):
+    """
+    Serialize a records page as one array per field
+
+    Filers and candidates repeat across most of a page, so each distinct one is
+    stored once in a lookup table and the `filer`/`candidate` columns hold its
+    index (or None). Values come straight from the ES hits without building a
+    model per record. The query description still goes through `query_model`
+    so it matches the row format.
+    """
+    hits = raw_result["hits"]["hits"]
+
+    columns = {field: [None] * len(hits) for field in fields}
+    filer_column = columns["filer"] = [None] * len(hits)
+    candidate_column = columns["candidate"] = [None] * len(hits)
+
+    filers, filer_idx = [], {}
+    candidates, candidate_idx = [], {}
+
+    for i, hit in enumerate(hits):
+        for key, value in hit["_source"].items():
+            key = _decamelize_key(key)
+
+            if key == "filer":
+                filer_column[i] = _encode_entity(value, filers, filer_idx)
+            elif key == "candidate":
+                candidate_column[i] = _encode_entity(value, candidates, candidate_idx)
+            elif key in columns:
+                columns[key][i] = (
+                    humps.decamelize(value) if isinstance(value, dict) else value
+                )
+
+    query = query_model(
+        **_serialize_records_query(raw_result, start_date, end_date, offset, limit)
+    )
+
+    return {
+        "columns": columns,
+        "filers": filers,
+        "candidates": candidates,
+        "query": jsonable_encoder(query),
+    }
+
+
+def serialize_count_result(total, start_date, end_date, cached):
+    return {
+        "total": total,
+        "query": {"start_date": start_date, "end_date": end_date, "cached": cached},
     }
 
 
@@ -73,12 +157,19 @@ def serialize_candidate_result(raw_result):
     return humps.decamelize(record["candidate"])
 
 
-def serialize_filers_associated_with_candidate(raw_result):
+def _get_bucket_name(bucket, name_agg, lookup_name):
+    if name_agg in bucket:
+        return bucket[name_agg]["buckets"][0]["key"]
+
+    return lookup_name(bucket["key"]) if lookup_name else None
+
+
+def serialize_filers_associated_with_candidate(raw_result, lookup_name=None):
     associated_filers = {}
 
     for bucket in raw_result["aggregations"]["associated_filers"]["buckets"]:
         associated_filers[bucket["key"]] = {
-            "name": bucket["filer_name"]["buckets"][0]["key"],
+            "name": _get_bucket_name(bucket, "filer_name", lookup_name),
             "count": bucket["filer_stats"]["count"],
             "total_amount": bucket["filer_stats"]["sum"],
             "avg_amount": bucket["filer_stats"]["avg"],
@@ -87,12 +178,12 @@ def serialize_filers_associated_with_candidate(raw_result):
     return {"associated_filers": associated_filers}
 
 
-def serialize_candidates_for_district(raw_result):
+def serialize_candidates_for_district(raw_result, lookup_name=None):
     candidates = {}
 
     for bucket in raw_result["aggregations"]["candidates"]["buckets"]:
         candidates[bucket["key"]] = {
-            "name": bucket["candidate_name"]["buckets"][0]["key"],
+            "name": _get_bucket_name(bucket, "candidate_name", lookup_name),
             "count": bucket["candidate_stats"]["count"],
             "total_amount": bucket["candidate_stats"]["sum"],
             "avg_amount": bucket["candidate_stats"]["avg"],
@@ -117,3 +208,62 @@ def serialize_state_districts(raw_result):
             upper_districts = districts
 
     return {"districts": {"lower": lower_districts, "upper": upper_districts}}
+
+
+def serialize_directory(raw_result):
+    aggs = raw_result["aggregations"]
+
+    return {
+        "districts": serialize_state_districts(raw_result)["districts"],
+        "candidates": {
+            b["key"]: b["name"]["buckets"][0]["key"]
+            for b in aggs["directory_candidates"]["buckets"]
+            if b["name"]["buckets"]
+        },
+        "filers": {
+            b["key"]: b["name"]["buckets"][0]["key"]
+            for b in aggs["directory_filers"]["buckets"]
+            if b["name"]["buckets"]
+        },
+    }
+
+
+def _serialize_stats(stats):
+    return {
+        "count": stats["count"],
+        "total_amount": stats["sum"],
+        # ES reports no average for empty buckets
+        "avg_amount": stats["avg"] or 0,
+    }
+
+
+def serialize_geo_result(raw_result):
+    aggs = raw_result["aggregations"]
+
+    residency = {
+        key: _serialize_stats(bucket["residency_stats"])
+        for key, bucket in aggs["residency"]["buckets"].items()
+    }
+
+    zip_prefixes = {}
+    for agg_name in ("zip3", "zip5"):
+        zip_prefixes[agg_name] = {
+            bucket["key"]: _serialize_stats(bucket["zip_stats"])
+            for bucket in aggs[agg_name]["buckets"]
+        }
+
+    return {"residency": residency, **zip_prefixes}
+
+
+def serialize_overlap_result(contributor_sets, pairs, start_date, end_date):
+    return {
+        "candidates": {
+            candidate_id: {
+                "contributors": len(contributor_set),
+                "total_amount": contributor_set.total_amount,
+            }
+            for candidate_id, contributor_set in contributor_sets.items()
+        },
+        "pairs": pairs,
+        "query": {"start_date": start_date, "end_date": end_date},
+    }
@@ -42,16 +42,52 @@ class QueryDesc(BaseModel):
     took: int
 
 
+class CostClass(str, Enum):
+    national_aggregation = "national_aggregation"
+    state_aggregation = "state_aggregation"
+    entity_summary = "entity_summary"
+    record_page = "record_page"
+    change_feed = "change_feed"
+
+
+class CountMode(str, Enum):
+    exact = "exact"
+    approx = "approx"
+    none = "none"
+
+
+class DebugMode(str, Enum):
+    profile = "profile"
+
+
+class RecordFormat(str, Enum):
+    rows = "rows"
+    columnar = "columnar"
+
+
+class TotalRelation(str, Enum):
+    eq = "eq"
+    gte = "gte"
+
+
 class ContribQueryDesc(QueryDesc):
     offset: int
     hits: int
-    total: int
+    total: Optional[int] = None
+    total_relation: Optional[TotalRelation] = None
 
 
 class ReportQueryDesc(QueryDesc):
     offset: int
     hits: int
-    total: int
+    total: Optional[int] = None
+    total_relation: Optional[TotalRelation] = None
+
+
+class CountQueryDesc(BaseModel):
+    start_date: datetime.date
+    end_date: datetime.date
+    cached: bool
 
 
 class Stats(BaseModel):
@@ -83,6 +119,18 @@ class StateSummary(Summary):
     districts: StateDistricts
 
 
+class GeoResidency(BaseModel):
+    in_state: Stats
+    out_of_state: Stats
+    unknown: Stats
+
+
+class GeoSummary(Summary):
+    residency: GeoResidency
+    zip3: Dict[str, Stats]
+    zip5: Dict[str, Stats]
+
+
 class CandidateStats(Stats):
     name: str
 
@@ -148,3 +196,57 @@ class Contributions(BaseModel):
 class Reports(BaseModel):
     records: List[Report]
     query: ReportQueryDesc
+
+
+class RecordCount(BaseModel):
+    total: int
+    query: CountQueryDesc
+
+
+class AdmissionStats(BaseModel):
+    max_concurrency: int
+    max_queued: int
+    max_queue_wait: float
+    in_flight: int
+    queued: int
+    admitted: int
+    rejected: int
+    avg_wait: float
+    max_wait: float
+
+
+class ConnectionStats(BaseModel):
+    host: str
+    alive: bool
+    dead_count: int
+    latency_ms: Optional[float] = None
+    requests: int
+    failures: int
+    pool_maxsize: int
+    pool_available: int
+    connections_opened: int
+
+
+class ContributorSetStats(BaseModel):
+    contributors: int
+    total_amount: float
+
+
+class CandidateOverlap(BaseModel):
+    candidate_a: str
+    candidate_b: str
+    shared_contributors: int
+    shared_amount_a: float
+    shared_amount_b: float
+    jaccard: float
+
+
+class OverlapQueryDesc(BaseModel):
+    start_date: datetime.date
+    end_date: datetime.date
+
+
+class OverlapSummary(BaseModel):
+    candidates: Dict[str, ContributorSetStats]
+    pairs: List[CandidateOverlap]
+    query: OverlapQueryDesc
@@ -0,0 +1,97 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from state_fin_api import admission
+from state_fin_api.admission import AdmissionLimiter
+
+
+def test_limiter_sheds_when_queue_full():
+    async def run():
+        limiter = AdmissionLimiter("test", 1, 0, 1.0)
+        await limiter.acquire()
+
+        with pytest.raises(HTTPException) as exc_info:
+            await limiter.acquire()
+
+        limiter.release()
+        return limiter, exc_info.value
+
+    limiter, exc = asyncio.run(run())
+
+    assert exc.status_code == 503
+    assert exc.headers == {"Retry-After": "1"}
+    assert limiter.get_stats()["rejected"] == 1
+    assert limiter.get_stats()["in_flight"] == 0
+
+
+def test_limiter_times_out_queued_requests():
+    async def run():
+        limiter = AdmissionLimiter("test", 1, 1, 0.01)
+        await limiter.acquire()
+
+        with pytest.raises(HTTPException):
+            await limiter.acquire()
+
+        # Once the slot frees up the next request is admitted
+        limiter.release()
+        await limiter.acquire()
+        return limiter
+
+    stats = asyncio.run(run()).get_stats()
+
+    assert stats["admitted"] == 2
+    assert stats["queued"] == 0
+    assert stats["rejected"] == 1
+
+
+def test_limiter_keeps_permit_acquired_as_wait_times_out(monkeypatch):
+    async def late_wait_for(awaitable, timeout):
+        # The acquire finishes, then the timeout fires anyway
+        await awaitable
+        raise asyncio.TimeoutError()
+
+    async def run():
+        limiter = AdmissionLimiter("test", 1, 1, 0.01)
+
+        monkeypatch.setattr(admission.asyncio, "wait_for", late_wait_for)
+        with pytest.raises(HTTPException):
+            await limiter.acquire()
+        monkeypatch.undo()
+
+        # The permit won by the rejected request was handed back
+        await limiter.acquire()
+        return limiter
+
+    stats = asyncio.run(run()).get_stats()
+
+    assert stats["admitted"] == 1
+    assert stats["rejected"] == 1
+
+
+def test_limiter_sheds_burst_immediately():
+    async def run():
+        limiter = AdmissionLimiter("test", 2, 2, 1.0)
+
+        async def request():
+            try:
+                await limiter.acquire()
+            except HTTPException as e:
+                return e.status_code, time.monotonic() - start
+
+            await asyncio.sleep(0.01)
+            limiter.release()
+            return 200, time.monotonic() - start
+
+        start = time.monotonic()
+        return limiter, await asyncio.gather(*[request() for _ in range(20)])
+
+    limiter, results = asyncio.run(run())
+
+    shed = [elapsed for status, elapsed in results if status == 503]
+    assert len(shed) == 16
+    assert max(shed) < 0.5
+    assert limiter.get_stats()["admitted"] == 4
+    assert limiter.get_stats()["queued"] == 0
@@ -0,0 +1,71 @@
+import datetime
+import json
+
+import pytest
+
+from state_fin_api import changes
+from state_fin_api.changes import (
+    decode_watermark,
+    encode_watermark,
+    get_start_positions,
+    iter_changes,
+)
+
+
+class StubElasticsearch:
+    def __init__(self, docs_by_index):
+        self.docs_by_index = docs_by_index
+        self.sort_fields = {}
+
+    def search(self, body, index):
+        self.sort_fields[index] = [next(iter(sort)) for sort in body["sort"]]
+        docs = sorted(self.docs_by_index[index])
+        if "search_after" in body:
+            docs = [d for d in docs if d > tuple(body["search_after"])]
+
+        hits = [{"sort": list(d), "_source": {"id": d[1]}} for d in docs]
+        return {"hits": {"hits": hits[: body["size"]]}}
+
+
+def test_watermark_round_trip():
+    positions = {"contribution": [1600000000000, "c1"], "report": None}
+
+    assert decode_watermark(encode_watermark(positions)) == positions
+
+    with pytest.raises(ValueError):
+        decode_watermark("not-a-watermark")
+
+
+def test_start_positions_from_timestamp():
+    since = datetime.datetime(2020, 9, 13, 12, 26, 40)
+
+    assert get_start_positions(since)["report"] == [1600000000000, ""]
+    assert get_start_positions()["contribution"] is None
+
+
+def test_iter_changes_merges_streams_and_resumes(monkeypatch):
+    monkeypatch.setattr(changes, "DEFAULT_LIMIT", 2)
+    es = StubElasticsearch(
+        {
+            "contribs": [(1, "c1"), (3, "c3"), (4, "c4")],
+            "reports": [(2, "r2"), (5, "r5")],
+        }
+    )
+    indices = {"contribution": "contribs", "report": "reports"}
+
+    lines = [json.loads(l) for l in iter_changes(es, indices, get_start_positions(), 3)]
+    records = [l["record"]["id"] for l in lines if "record" in l]
+
+    assert records == ["c1", "r2", "c3"]
+    assert lines[-1]["has_more"] is True
+    assert es.sort_fields == {
+        "contribs": ["ingested_at", "contribution_id"],
+        "reports": ["ingested_at", "report_id"],
+    }
+
+    positions = decode_watermark(lines[-1]["watermark"])
+    lines = [json.loads(l) for l in iter_changes(es, indices, positions)]
+    records = [l["record"]["id"] for l in lines if "record" in l]
+
+    assert records == ["c4", "r5"]
+    assert lines[-1]["has_more"] is False
@@ -0,0 +1,44 @@
+import asyncio
+import gzip
+
+from state_fin_api.compression import (
+    CompressionMiddleware,
+    choose_encoding,
+    parse_accept_encoding,
+)
+
+
+def test_parse_accept_encoding():
+    assert parse_accept_encoding("gzip, br;q=0.5, identity;q=0") == {
+        "gzip": 1.0,
+        "br": 0.5,
+        "identity": 0.0,
+    }
+
+
+def test_choose_encoding():
+    assert choose_encoding("gzip") == "gzip"
+    assert choose_encoding("deflate, gzip;q=0") is None
+    assert choose_encoding("identity") is None
+    assert choose_encoding("") is None
+
+
+def test_cacheable_bodies_are_compressed_once():
+    middleware = CompressionMiddleware(app=None)
+    body = b'{"count": 1}' * 200
+    key = ("/tx", b"")
+
+    async def run():
+        first = await middleware.compress(body, "gzip", 9, key)
+        # Only ES's took differs between repeat hits, the cached body is reused
+        second = await middleware.compress(body + b" ", "gzip", 9, key)
+        uncached = await middleware.compress(large, "gzip", 9)
+        return first, second, uncached
+
+    large = b'{"count": 2}' * 10000
+    first, second, uncached = asyncio.run(run())
+
+    assert first is second
+    assert gzip.decompress(first) == body
+    assert gzip.decompress(uncached) == large
+    assert len(middleware.cache) == 1
@@ -0,0 +1,61 @@
+import datetime
+
+from state_fin_api import counts
+from state_fin_api.cache import TTLCache
+from state_fin_api.counts import count_records, search_records
+from state_fin_api.query import build_contrib_records_query, get_candidate_filter_set
+
+
+class StubElasticsearch:
+    def __init__(self, total):
+        self.total = total
+        self.searches = []
+        self.counts = 0
+
+    def search(self, body, index):
+        self.searches.append(dict(body))
+
+        hits = {"hits": []}
+        if body["track_total_hits"] is not False:
+            hits["total"] = {"value": self.total, "relation": "eq"}
+        return {"hits": hits}
+
+    def count(self, body, index):
+        self.counts += 1
+        return {"count": self.total}
+
+
+def _page(offset):
+    filters = get_candidate_filter_set("C1")
+    return build_contrib_records_query(
+        size=10, offset=offset, filters=filters, count="exact"
+    )
+
+
+def test_later_pages_reuse_cached_total(monkeypatch):
+    monkeypatch.setattr(counts, "total_count_cache", TTLCache())
+    es = StubElasticsearch(total=1234)
+
+    search_records(es, _page(0), "tx_contribs_dev", "exact")
+    later = search_records(es, _page(10), "tx_contribs_dev", "exact")
+
+    assert es.searches[0]["track_total_hits"] is True
+    assert es.searches[1]["track_total_hits"] is False
+    assert later["hits"]["total"] == {"value": 1234, "relation": "eq"}
+
+
+def test_count_primes_records_total(monkeypatch):
+    monkeypatch.setattr(counts, "total_count_cache", TTLCache())
+    es = StubElasticsearch(total=42)
+    start, end = datetime.date(2019, 1, 1), datetime.date(2020, 1, 1)
+
+    first = count_records(es, _page(0), "tx_contribs_dev", start, end)
+    assert (first["total"], first["query"]["cached"]) == (42, False)
+
+    page = search_records(es, _page(20), "tx_contribs_dev", "exact")
+    assert es.searches[0]["track_total_hits"] is False
+    assert page["hits"]["total"]["value"] == 42
+
+    again = count_records(es, _page(0), "tx_contribs_dev", start, end)
+    assert again["query"]["cached"] is True
+    assert es.counts == 1
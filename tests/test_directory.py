@@ -0,0 +1,59 @@
+import datetime
+
+from state_fin_api import directory
+from state_fin_api.directory import DirectoryStore, write_directory
+
+
+def test_directory_round_trip(tmp_path):
+    path = str(tmp_path / "tx_directory.bin")
+    write_directory(
+        path,
+        {
+            "districts": {"lower": [1, 2, 3], "upper": [1]},
+            "candidates": {"C2": "Bea", "C1": "Al", "C10": "Día"},
+            "filers": {},
+        },
+    )
+
+    store = DirectoryStore(path)
+
+    assert store.districts == {"lower": [1, 2, 3], "upper": [1]}
+    assert store.candidate_name("C1") == "Al"
+    assert store.candidate_name("C10") == "Día"
+    assert store.candidate_name("C3") is None
+    assert store.filer_name("F1") is None
+    assert not store.is_stale()
+
+
+def test_get_directory_remaps_on_change(tmp_path, monkeypatch):
+    monkeypatch.setattr(directory, "DIRECTORY_DIR", str(tmp_path))
+    assert directory.get_directory("tx") is None
+
+    path = directory.get_directory_path("tx")
+    base = {"districts": {"lower": [], "upper": []}, "filers": {}}
+    write_directory(path, dict(base, candidates={"C1": "Al"}))
+    assert directory.get_directory("tx").candidate_name("C1") == "Al"
+
+    write_directory(path, dict(base, candidates={"C1": "Alice"}))
+    assert directory.get_directory("tx").candidate_name("C1") == "Alice"
+
+
+def test_directory_covers_default_range_only(tmp_path, monkeypatch):
+    monkeypatch.setenv("API_ENV", "prod")
+    monkeypatch.setattr(directory, "DIRECTORY_DIR", str(tmp_path))
+
+    path = directory.get_directory_path("tx")
+    assert path.endswith("tx_prod_directory.bin")
+
+    write_directory(path, {"districts": {}, "candidates": {}, "filers": {}})
+    store = DirectoryStore(path)
+
+    start = directory.DEFAULT_START_DATE
+    today = datetime.date.today()
+    assert store.covers(start, today)
+    assert store.covers(start, today + datetime.timedelta(days=30))
+
+    # Ends before the build, or starts before the data the directory was built on
+    assert not store.covers(start, datetime.date(2019, 2, 1))
+    assert not store.covers(datetime.date(2018, 1, 1), today)
+    assert not store.covers(datetime.date(2020, 1, 1), today)
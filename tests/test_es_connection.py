@@ -0,0 +1,56 @@
+import pytest
+from elasticsearch import Urllib3HttpConnection
+from elasticsearch.exceptions import ConnectionError, ConnectionTimeout
+
+from state_fin_api.es.connection import (
+    LatencyAwareSelector,
+    LatencyTrackingConnection,
+    NO_RETRY_ON_TIMEOUT,
+    RequestTimeout,
+)
+
+
+def test_latency_ewma_resets_on_failure():
+    connection = LatencyTrackingConnection(host="localhost", port=9200)
+
+    connection._record(0.1, failed=False)
+    connection._record(0.2, failed=False)
+    assert abs(connection.latency_ewma - 0.13) < 1e-9
+
+    connection._record(1.0, failed=True)
+    assert connection.latency_ewma is None
+    assert (connection.requests, connection.failures) == (3, 1)
+
+
+def test_selector_prefers_faster_node():
+    fast = LatencyTrackingConnection(host="fast")
+    slow = LatencyTrackingConnection(host="slow")
+    fast._record(0.01, failed=False)
+    slow._record(0.5, failed=False)
+
+    selector = LatencyAwareSelector({})
+
+    assert all(selector.select([slow, fast]) is fast for _ in range(20))
+
+
+def test_timeouts_opted_out_of_retries_are_not_connection_errors(monkeypatch):
+    sent_params = []
+
+    def timeout(self, method, url, params=None, *args, **kwargs):
+        sent_params.append(params)
+        raise ConnectionTimeout("TIMEOUT", "timed out", None)
+
+    monkeypatch.setattr(Urllib3HttpConnection, "perform_request", timeout)
+    connection = LatencyTrackingConnection(host="localhost")
+
+    with pytest.raises(ConnectionTimeout):
+        connection.perform_request("GET", "/_search", {})
+    assert connection.failures == 1
+
+    with pytest.raises(RequestTimeout):
+        connection.perform_request("GET", "/_search", {NO_RETRY_ON_TIMEOUT: True})
+
+    # The transport would retry a ConnectionError on another node
+    assert not issubclass(RequestTimeout, ConnectionError)
+    assert sent_params[-1] == {}
+    assert connection.failures == 1
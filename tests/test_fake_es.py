@@ -0,0 +1,60 @@
+import json
+
+from benchmarks.fake_es import FakeElasticsearch, get_query_kind, synthetic_response
+from state_fin_api.query import (
+    build_contrib_summary_query,
+    build_contrib_records_query,
+    get_available_districts_aggs,
+)
+
+
+def test_synthetic_records_page():
+    query = build_contrib_records_query(size=500)
+    res = synthetic_response(query, "tx_contribs_dev")
+
+    assert len(res["hits"]["hits"]) == 500
+    assert "contribution_id" in res["hits"]["hits"][0]["_source"]
+    assert "aggregations" not in res
+
+
+def test_synthetic_district_aggs():
+    query = build_contrib_summary_query(addtl_aggs=get_available_districts_aggs())
+    res = synthetic_response(query, "tx_contribs_dev")
+
+    houses = res["aggregations"]["districts_by_house"]["buckets"]
+    assert [b["key"] for b in houses] == ["lower", "upper"]
+    assert len(houses[0]["districts"]["buckets"]) == 150
+    assert "sum" in res["aggregations"]["contribution_stats"]
+
+
+def test_fake_es_returns_fresh_copies():
+    es = FakeElasticsearch()
+    query = build_contrib_records_query(size=1)
+
+    first = es.search(query, "tx_reports_dev")
+    first["hits"]["hits"].clear()
+
+    assert len(es.search(query, "tx_reports_dev")["hits"]["hits"]) == 1
+    assert get_query_kind(query, "tx_reports_dev") == "report_records"
+
+
+def test_recordings_only_replayed_to_matching_queries(tmp_path):
+    summary_query = build_contrib_summary_query()
+    recorded = synthetic_response(summary_query, "tx_contribs_dev", seed=1)
+    (tmp_path / "summary.json").write_text(json.dumps(recorded))
+
+    es = FakeElasticsearch(record_dir=str(tmp_path))
+    assert es.search(summary_query, "tx_contribs_dev") == recorded
+
+    # The recording has no districts agg, so that query gets a synthetic response
+    district_query = build_contrib_summary_query(
+        addtl_aggs=get_available_districts_aggs()
+    )
+    res = es.search(district_query, "tx_contribs_dev")
+    assert "districts_by_house" in res["aggregations"]
+
+    kind = get_query_kind(district_query, "tx_contribs_dev")
+    assert kind == (
+        "aggs-contribution_by_type-contribution_stats-districts_by_house-"
+        "latest_contribution"
+    )
@@ -0,0 +1,76 @@
+from state_fin_api import overlap
+from state_fin_api.overlap import (
+    build_contributor_set,
+    get_overlap_matrix,
+    hash_contributor,
+    ContributorSet,
+)
+
+
+class StubElasticsearch:
+    def __init__(self, pages):
+        self.pages = pages
+
+    def search(self, body, index):
+        after = body["aggs"]["contributors"]["composite"].get("after")
+        page = self.pages[0 if after is None else after["page"]]
+
+        return {"aggregations": {"contributors": page}}
+
+
+def _bucket(name, zip, amount):
+    return {"key": {"name": name, "zip": zip}, "total_amount": {"value": amount}}
+
+
+def test_hash_contributor_normalizes():
+    assert hash_contributor("Jane Doe ", "78701-1234") == hash_contributor(
+        "JANE DOE", "78701"
+    )
+    assert hash_contributor("Jane Doe", "78701") != hash_contributor("Jane Doe", None)
+
+
+def test_build_contributor_set_pages(monkeypatch):
+    monkeypatch.setattr(overlap, "CONTRIBUTOR_PAGE_SIZE", 2)
+    es = StubElasticsearch(
+        [
+            {
+                "buckets": [
+                    _bucket("JANE DOE", "78701", 10),
+                    _bucket("Jane Doe", "78701", 5),
+                ],
+                "after_key": {"page": 1},
+            },
+            {"buckets": [_bucket("JOHN ROE", None, 20)], "after_key": {"page": 2}},
+        ]
+    )
+
+    contributor_set = build_contributor_set(es, "tx_contribs_dev", [], None, None)
+
+    assert len(contributor_set) == 2
+    assert list(contributor_set.ids) == sorted(contributor_set.ids)
+    assert contributor_set.total_amount == 35
+
+
+def test_overlap_matrix(monkeypatch):
+    sets = {
+        "A": ContributorSet({1: 10.0, 2: 20.0, 3: 30.0}),
+        "B": ContributorSet({2: 5.0, 3: 5.0, 4: 5.0}),
+        "C": ContributorSet({}),
+    }
+
+    pairs = {(p["candidate_a"], p["candidate_b"]): p for p in get_overlap_matrix(sets)}
+
+    assert pairs[("A", "B")] == {
+        "candidate_a": "A",
+        "candidate_b": "B",
+        "shared_contributors": 2,
+        "shared_amount_a": 50.0,
+        "shared_amount_b": 10.0,
+        "jaccard": 0.5,
+    }
+    assert pairs[("A", "C")]["shared_contributors"] == 0
+    assert pairs[("B", "C")]["jaccard"] == 0.0
+
+    # Repeat matrices over the same sets are answered from the pair cache
+    monkeypatch.setattr(overlap, "_intersect_totals", None)
+    assert get_overlap_matrix(sets) == list(pairs.values())
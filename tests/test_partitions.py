@@ -0,0 +1,59 @@
+import datetime
+
+from state_fin_api import partitions
+from state_fin_api.partitions import discover_partitions, plan_index
+
+
+class StubIndices:
+    def get_alias(self, index):
+        names = [
+            "tx_contribs_dev_2019",
+            "tx_contribs_dev_2020",
+            "tx_contribs_dev_2021",
+            "mi_contribs_dev_2022",
+            "tx_reports_dev_2020",
+            "tx_contribs_dev",
+            "ok_contribs_dev",
+            "ok_reports_dev",
+        ]
+        return {name: {"aliases": {}} for name in names}
+
+
+class StubElasticsearch:
+    indices = StubIndices()
+
+
+def test_plan_index(monkeypatch):
+    monkeypatch.setattr(partitions, "_partitions", {})
+    monkeypatch.setattr(partitions, "_unpartitioned", [])
+    discover_partitions(StubElasticsearch(), "dev")
+
+    start = datetime.date(2020, 6, 1)
+    end = datetime.date(2021, 1, 31)
+
+    assert plan_index("tx_contribs_dev", start, end) == (
+        "tx_contribs_dev_2020,tx_contribs_dev_2021"
+    )
+    assert plan_index("tx_contribs_dev") == "tx_contribs_dev_*"
+
+    # Out of range still searches one partition, unpartitioned bases are untouched
+    assert plan_index("tx_contribs_dev", datetime.date(2030, 1, 1)) == (
+        "tx_contribs_dev_2021"
+    )
+    assert plan_index("ok_contribs_dev", start, end) == "ok_contribs_dev"
+
+
+def test_plan_wildcard_index_with_unpartitioned_states(monkeypatch):
+    monkeypatch.setattr(partitions, "_partitions", {})
+    monkeypatch.setattr(partitions, "_unpartitioned", [])
+    discover_partitions(StubElasticsearch(), "dev")
+
+    start = datetime.date(2020, 6, 1)
+    end = datetime.date(2021, 1, 31)
+
+    # tx has partitions alongside its old index, ok has only the single index
+    assert plan_index("*_contribs_dev", start, end) == (
+        "*_contribs_dev_2020,*_contribs_dev_2021,ok_contribs_dev"
+    )
+    assert plan_index("*_contribs_dev") == "*_contribs_dev_*,ok_contribs_dev"
+    assert plan_index("*_reports_dev", datetime.date(2030, 1, 1)) == "ok_reports_dev"
@@ -0,0 +1,54 @@
+from state_fin_api.profile import condense_profile, ProfilingElasticsearch
+
+
+def _node(type, description, nanos, children=()):
+    return {
+        "type": type,
+        "description": description,
+        "time_in_nanos": nanos,
+        "children": list(children),
+    }
+
+
+def test_condense_profile_merges_shards():
+    shard = {
+        "searches": [{"query": [_node("BooleanQuery", "bool", 3000000)]}],
+        "aggregations": [
+            _node("StatsAggregator", "contribution_stats", 1000000),
+            _node(
+                "GlobalOrdinalsStringTermsAggregator",
+                "districts_by_house",
+                2000000,
+                [_node("NumericTermsAggregator", "districts", 1500000)],
+            ),
+        ],
+    }
+
+    condensed = condense_profile({"shards": [shard, shard]})
+
+    assert condensed["shards"] == 2
+    assert condensed["query"][0]["time_ms"] == 6
+    assert condensed["query"][0]["max_shard_time_ms"] == 3
+
+    aggs = condensed["aggregations"]
+    assert [a["description"] for a in aggs] == [
+        "districts_by_house",
+        "contribution_stats",
+    ]
+    assert aggs[0]["children"][0]["time_ms"] == 3
+
+
+def test_profiling_client_records_counts():
+    class StubElasticsearch:
+        def count(self, body=None, index=None):
+            return {"count": 7}
+
+    profiling_es = ProfilingElasticsearch(StubElasticsearch())
+    query = {"query": {"match_all": {}}}
+
+    assert profiling_es.count(query, "tx_contribs_dev") == {"count": 7}
+
+    [recorded] = profiling_es.searches
+    assert recorded["api"] == "count"
+    assert recorded["body"] == query
+    assert recorded["profile"] is None
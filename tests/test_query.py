@@ -0,0 +1,38 @@
+from state_fin_api.query import (
+    build_contrib_records_query,
+    build_report_records_query,
+    get_candidate_filter_set,
+    get_geo_aggs,
+    get_query_signature,
+    ZIP_PREFIX_FIELDS,
+)
+
+
+def test_records_count_modes():
+    assert build_contrib_records_query(count="exact")["track_total_hits"] is True
+    assert build_contrib_records_query(count="approx")["track_total_hits"] == 10000
+    assert build_report_records_query(count="none")["track_total_hits"] is False
+
+
+def test_query_signature_ignores_paging():
+    filters = get_candidate_filter_set("C1")
+    first = build_contrib_records_query(size=10, offset=0, filters=filters)
+    later = build_contrib_records_query(size=10, offset=500, filters=filters)
+    other = build_contrib_records_query(filters=get_candidate_filter_set("C2"))
+
+    signature = get_query_signature("tx_contribs_dev", first)
+    assert signature == get_query_signature("tx_contribs_dev", later)
+    assert signature != get_query_signature("mi_contribs_dev", first)
+    assert signature != get_query_signature("tx_contribs_dev", other)
+
+
+def test_geo_aggs(monkeypatch):
+    aggs = get_geo_aggs("tx", zip_limit=5)
+
+    residency = aggs["residency"]["filters"]["filters"]
+    assert residency["in_state"] == {"terms": {"state.keyword": ["TX", "tx"]}}
+    assert set(residency) == {"in_state", "out_of_state", "unknown"}
+    assert aggs["zip3"]["terms"]["script"]["params"] == {"length": 3}
+
+    monkeypatch.setitem(ZIP_PREFIX_FIELDS, 3, "zip3.keyword")
+    assert get_geo_aggs("tx")["zip3"]["terms"] == {"field": "zip3.keyword", "size": 10}
@@ -0,0 +1,63 @@
+import datetime
+
+from fastapi.encoders import jsonable_encoder
+
+from state_fin_api.serialize import (
+    serialize_columnar_records_result,
+    serialize_records_result,
+)
+from state_fin_api.types import ReportQueryDesc, Reports
+
+
+def test_columnar_records_dictionary_encodes_entities():
+    filer = {"filerId": "F1", "type": "COH", "name": "Committee"}
+    raw_result = {
+        "took": 3,
+        "timed_out": False,
+        "hits": {
+            "total": {"value": 3, "relation": "eq"},
+            "hits": [
+                {"_source": {"reportId": "1", "filer": filer, "candidate": None}},
+                {"_source": {"reportId": "2", "filer": dict(filer)}},
+                {"_source": {"reportId": "3", "filer": dict(filer, filerId="F2")}},
+            ],
+        },
+    }
+
+    result = serialize_columnar_records_result(
+        raw_result,
+        ["report_id", "type"],
+        ReportQueryDesc,
+        datetime.date(2019, 1, 1),
+        datetime.datetime(2020, 1, 1, 11, 47),
+        0,
+        3,
+    )
+
+    assert result["columns"] == {
+        "report_id": ["1", "2", "3"],
+        "type": [None, None, None],
+        "filer": [0, 0, 1],
+        "candidate": [None, None, None],
+    }
+    assert [f["filer_id"] for f in result["filers"]] == ["F1", "F2"]
+    assert result["candidates"] == []
+    assert result["query"]["start_date"] == "2019-01-01"
+    assert result["query"]["end_date"] == "2020-01-01"
+    assert result["query"]["total"] == 3
+
+
+def test_columnar_and_row_query_descriptions_match():
+    raw_result = {
+        "took": 3,
+        "timed_out": False,
+        "hits": {"total": {"value": 0, "relation": "eq"}, "hits": []},
+    }
+    args = (datetime.date(2019, 1, 1), datetime.datetime(2020, 1, 1, 11, 47), 0, 10)
+
+    rows = Reports(**serialize_records_result(raw_result, *args))
+    columnar = serialize_columnar_records_result(
+        raw_result, ["report_id"], ReportQueryDesc, *args
+    )
+
+    assert columnar["query"] == jsonable_encoder(rows)["query"]